@@ -0,0 +1,110 @@
+import argparse
+import time
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from market_store import MarketStore, load_round
+
+LEVELS = 3
+
+# every feature is computed in the same float64 operations, in the same order, as BookFeatures in
+# trading/traitor.py, so a signal fitted on these columns sees bit-identical inputs live.
+# sums over levels run best level first starting from 0. a level is missing when its price is, a
+# quoted level with 0 volume still counts as the best level the way it does in an OrderDepth
+FEATURES = [
+    "imbalance",             # (bid_volume_1 - ask_volume_1) / (bid_volume_1 + ask_volume_1)
+    "depth_imbalance",       # the same over all three levels
+    "microprice",            # best prices weighted by the opposite side's level 1 volume
+    "weighted_mid",          # average of the bid and ask volume weighted prices over all levels
+    "depth_spread",          # ask vwap - bid vwap over all levels
+    "bid_queue_change",      # level 1 queue changes against the previous row of the same product and day
+    "ask_queue_change",
+    "order_flow_imbalance",  # bid_queue_change - ask_queue_change
+]
+
+
+def side(store: MarketStore, name: str) -> Tuple[np.ndarray, np.ndarray]:
+    # (levels, rows) prices and volumes, missing levels have price 0 and volume 0
+    prices = np.stack([np.asarray(store.column(f"{name}_price_{level}")) for level in range(1, LEVELS + 1)])
+    volumes = np.stack([np.asarray(store.column(f"{name}_volume_{level}"), dtype=np.float64) for level in range(1, LEVELS + 1)])
+    missing = np.isnan(prices)
+    return np.where(missing, 0.0, prices), np.where(missing, 0.0, volumes)
+
+
+def vwap(prices: np.ndarray, volumes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    notional = np.zeros(prices.shape[1])
+    depth = np.zeros(prices.shape[1])
+    for level in range(LEVELS):
+        notional = notional + prices[level] * volumes[level]
+        depth = depth + volumes[level]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(depth > 0, notional / depth, np.nan), depth
+
+
+def queue_change(prices: np.ndarray, volumes: np.ndarray, previous: np.ndarray, improving: int) -> np.ndarray:
+    # level 1 order flow: a better price brings its whole queue, a worse one takes the old queue away.
+    # improving is 1 for bids (higher is better) and -1 for asks
+    price, volume = prices[0], volumes[0]
+    old_price = np.r_[0.0, price[:-1]]
+    old_volume = np.r_[0.0, volume[:-1]]
+    direction = np.sign(price - old_price) * improving
+    change = np.where(direction > 0, volume, np.where(direction < 0, -old_volume, volume - old_volume))
+    valid = previous & (price > 0) & (old_price > 0)
+    return np.where(valid, change, 0.0)
+
+
+def book_features(store: MarketStore) -> Dict[str, np.ndarray]:
+    if "bid_price_1" not in store.columns:
+        raise ValueError(f"round {store.round_num} has no order book levels")
+    bid_prices, bid_volumes = side(store, "bid")
+    ask_prices, ask_volumes = side(store, "ask")
+    bid_vwap, bid_depth = vwap(bid_prices, bid_volumes)
+    ask_vwap, ask_depth = vwap(ask_prices, ask_volumes)
+    top = bid_volumes[0] + ask_volumes[0]
+    one_sided = (bid_prices[0] == 0) | (ask_prices[0] == 0) | (top == 0)
+
+    # rows are sorted by (product, day, timestamp), the row before is only a predecessor inside the same run
+    product = np.asarray(store.column("product"))
+    day = np.asarray(store.column("day"))
+    previous = np.r_[False, (product[1:] == product[:-1]) & (day[1:] == day[:-1])]
+    bid_change = queue_change(bid_prices, bid_volumes, previous, 1)
+    ask_change = queue_change(ask_prices, ask_volumes, previous, -1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {
+            "imbalance": np.where(one_sided, np.nan, (bid_volumes[0] - ask_volumes[0]) / top),
+            "depth_imbalance": np.where((bid_depth == 0) | (ask_depth == 0), np.nan, (bid_depth - ask_depth) / (bid_depth + ask_depth)),
+            "microprice": np.where(one_sided, np.nan, (bid_prices[0] * ask_volumes[0] + ask_prices[0] * bid_volumes[0]) / top),
+            "weighted_mid": (bid_vwap + ask_vwap) / 2,
+            "depth_spread": ask_vwap - bid_vwap,
+            "bid_queue_change": bid_change,
+            "ask_queue_change": ask_change,
+            "order_flow_imbalance": bid_change - ask_change,
+        }
+
+
+def round_features(round_num: int) -> pd.DataFrame:
+    # one row per book row of the round, every product and day in one pass
+    store = load_round(round_num)
+    frame = pd.DataFrame({
+        "day": np.asarray(store.column("day")),
+        "timestamp": np.asarray(store.column("timestamp")),
+        "product": np.asarray(store.products)[np.asarray(store.column("product"))],
+    })
+    for name, values in book_features(store).items():
+        frame[name] = values
+    return frame
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("rounds", type=int, nargs="+")
+    args = parser.parse_args()
+
+    for round_num in args.rounds:
+        start = time.perf_counter()
+        frame = round_features(round_num)
+        print(f"round {round_num}: {len(frame)} rows in {(time.perf_counter() - start) * 1000:.1f} ms")
+        print(frame.groupby("product")[FEATURES].mean().to_string())
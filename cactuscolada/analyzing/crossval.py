@@ -0,0 +1,280 @@
+import argparse
+import copy
+import hashlib
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from loader import product_frame
+import orchid_features
+
+ANALYZING_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(ANALYZING_DIR, "crossval_cache")
+
+# (training days, test day). every split only ever tests on whole days, rows of one day never
+# end up on both sides the way train_test_split's shuffled rows do
+Fold = Tuple[List[int], int]
+
+
+def walk_forward(days: List[int]) -> List[Fold]:
+    # train on every day before the test day
+    return [(days[:i], days[i]) for i in range(1, len(days))]
+
+
+def leave_one_day_out(days: List[int]) -> List[Fold]:
+    return [([day for day in days if day != test_day], test_day) for test_day in days]
+
+
+SCHEMES: Dict[str, Callable[[List[int]], List[Fold]]] = {
+    "walk-forward": walk_forward,
+    "leave-one-day-out": leave_one_day_out,
+}
+
+
+def metrics(y_true: np.ndarray, y_pred: np.ndarray) -> Dict[str, float]:
+    errors = y_true - y_pred
+    mse = float(np.mean(errors ** 2))
+    variance = float(np.var(y_true))
+    return {
+        "mae": float(np.mean(np.abs(errors))),
+        "mse": mse,
+        "r2": 1 - mse / variance if variance > 0 else float("nan"),
+    }
+
+
+def describe_estimator(estimator: Any) -> str:
+    params = estimator.get_params() if hasattr(estimator, "get_params") else vars(estimator)
+    return type(estimator).__name__ + json.dumps(params, sort_keys=True, default=str)
+
+
+def data_digest(X: np.ndarray, y: np.ndarray, days: np.ndarray) -> str:
+    digest = hashlib.sha1()
+    for array in (X, y, days):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+
+def fold_key(name: str, features: List[str], estimator: str, digest: str, fold: Fold) -> str:
+    # keyed per fold, so walk-forward and leave-one-day-out share the folds they have in common
+    blob = json.dumps([name, features, estimator, digest, fold[0], fold[1]])
+    return hashlib.sha1(blob.encode()).hexdigest()
+
+
+def fit_fold(estimator: Any, X: np.ndarray, y: np.ndarray, days: np.ndarray, fold: Fold) -> Tuple[Any, Dict[str, float]]:
+    train_days, test_day = fold
+    train = np.isin(days, train_days)
+    test = days == test_day
+    model = copy.deepcopy(estimator)
+    model.fit(X[train], y[train])
+    return model, metrics(y[test], model.predict(X[test]))
+
+
+class FoldResult:
+    def __init__(self, fold: Fold, model: Any, scores: Dict[str, float], cached: bool) -> None:
+        self.train_days, self.test_day = fold
+        self.model = model
+        self.scores = scores
+        self.cached = cached
+
+
+class CrossValResult:
+    def __init__(self, name: str, scheme: str, folds: List[FoldResult]) -> None:
+        self.name = name
+        self.scheme = scheme
+        self.folds = folds
+
+    def mean(self, metric: str) -> float:
+        return float(np.mean([fold.scores[metric] for fold in self.folds]))
+
+    def summary(self) -> str:
+        lines = [f"{self.name} ({self.scheme})"]
+        for fold in self.folds:
+            cached = "  cached" if fold.cached else ""
+            lines.append(f"  train {fold.train_days} test {fold.test_day:>2}  mae {fold.scores['mae']:10.4f}  mse {fold.scores['mse']:12.4f}  r2 {fold.scores['r2']:8.4f}{cached}")
+        lines.append(f"  mean{'':>26}mae {self.mean('mae'):10.4f}  mse {self.mean('mse'):12.4f}  r2 {self.mean('r2'):8.4f}")
+        return "\n".join(lines)
+
+
+def cross_validate(name: str, estimator: Any, X: np.ndarray, y: np.ndarray, days: np.ndarray, features: List[str] = None,
+                   scheme: str = "walk-forward", workers: int = None, cache_dir: str = CACHE_DIR) -> CrossValResult:
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    days = np.asarray(days)
+    folds = SCHEMES[scheme](sorted(int(day) for day in np.unique(days)))
+
+    description = describe_estimator(estimator)
+    digest = data_digest(X, y, days)
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+
+    results: Dict[int, FoldResult] = {}
+    pending = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for index, fold in enumerate(folds):
+            path = os.path.join(cache_dir, fold_key(name, features, description, digest, fold) + ".pkl") if cache_dir else None
+            if path and os.path.exists(path):
+                with open(path, "rb") as file:
+                    model, scores = pickle.load(file)
+                results[index] = FoldResult(fold, model, scores, True)
+            else:
+                pending[executor.submit(fit_fold, estimator, X, y, days, fold)] = (index, fold, path)
+
+        for future, (index, fold, path) in pending.items():
+            model, scores = future.result()
+            if path:
+                with open(path, "wb") as file:
+                    pickle.dump((model, scores), file)
+            results[index] = FoldResult(fold, model, scores, False)
+
+    return CrossValResult(name, scheme, [results[index] for index in range(len(folds))])
+
+
+def windows(prices: np.ndarray, days: np.ndarray, window_size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # the last window_size prices -> the next price, never reaching across a day boundary
+    X, y, row_days = [], [], []
+    for day in np.unique(days):
+        values = prices[days == day]
+        X.append(np.lib.stride_tricks.sliding_window_view(values[:-1], window_size))
+        y.append(values[window_size:])
+        row_days.append(np.full(len(values) - window_size, day))
+    return np.concatenate(X), np.concatenate(y), np.concatenate(row_days)
+
+
+# the model scripts' feature sets, each returns (X, y, days, feature names, estimator)
+def starfruit_window():
+    from sklearn.linear_model import LinearRegression
+    data = product_frame(1, "STARFRUIT", ["day", "mid_price"])
+    X, y, days = windows(data["mid_price"].to_numpy(), data["day"].to_numpy(), 4)
+    return X, y, days, [f"mid_{i}" for i in range(4)], LinearRegression()
+
+
+def basket_window():
+    from sklearn.linear_model import LinearRegression
+    data = product_frame(3, "GIFT_BASKET", ["day", "mid_price"])
+    X, y, days = windows(data["mid_price"].to_numpy(), data["day"].to_numpy(), 40)
+    return X, y, days, [f"mid_{i}" for i in range(40)], LinearRegression()
+
+
+def ahead(values: np.ndarray, days: np.ndarray, horizon: int) -> np.ndarray:
+    # the value horizon rows later in the same day, nan past the end of the day
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(len(values), np.nan)
+    same_day = days[horizon:] == days[:-horizon]
+    out[:-horizon] = np.where(same_day, values[horizon:], np.nan)
+    return out
+
+
+def orchid_frame():
+    return product_frame(2, "ORCHIDS", ["day", "mid_price", "humidity", "sunlight", "transport_fees", "export_tariff", "import_tariff"])
+
+
+def orchid_forest():
+    # data_round2/model2.py
+    from sklearn.ensemble import RandomForestRegressor
+    data = product_frame(2, "ORCHIDS", ["day", "mid_price", "humidity", "sunlight"])
+    features = ["humidity_penalty", "sunlight_sum"]
+    # model2.py rolls a 10000 row sum over the days back to back, which reaches into the previous day.
+    # a day is 10001 rows, so within a day that window is, to one row, the running total since the open.
+    sunlight = np.concatenate([orchid_features.cumulative_sunlight(data["sunlight"][data["day"] == day]) for day in np.unique(data["day"])])
+    X = np.column_stack([orchid_features.humidity_penalty(data["humidity"]), sunlight])
+    return X, data["mid_price"].to_numpy(), data["day"].to_numpy(), features, RandomForestRegressor(n_estimators=10, random_state=42)
+
+
+def orchid_humidity():
+    # data_round2/model8.py
+    from sklearn.linear_model import LinearRegression
+    data = product_frame(2, "ORCHIDS", ["day", "mid_price", "humidity", "sunlight"])
+    X, y, days = [], [], []
+    for day in np.unique(data["day"]):
+        rows = data[data["day"] == day]
+        X.append(orchid_features.humidity_penalty(rows["humidity"])[1:-100])
+        y.append(orchid_features.future_return(rows["mid_price"], 100)[1:-100])
+        days.append(np.full(len(rows) - 101, day))
+    return np.concatenate(X).reshape(-1, 1), np.concatenate(y), np.concatenate(days), ["humidity_penalty"], LinearRegression()
+
+
+def orchid_fees():
+    # data_round2/model3.py
+    from sklearn.linear_model import LinearRegression
+    data = orchid_frame()
+    features = ["transport_fees", "export_tariff", "import_tariff"]
+    return data[features].to_numpy(), data["mid_price"].to_numpy(), data["day"].to_numpy(), features, LinearRegression()
+
+
+def orchid_production_index():
+    # data_round2/model4.py, the price 10 rows ahead
+    from sklearn.linear_model import LinearRegression
+    data = orchid_frame()
+    days = data["day"].to_numpy()
+    humidity_index = 1 / orchid_features.humidity_penalty(data["humidity"])
+    sunlight_index = 1 / (1 - np.maximum(orchid_features.REQUIRED_LUMENS - data["sunlight"].to_numpy(), 0) / (2500 / 42) * orchid_features.SUNLIGHT_PENALTY)
+    X = np.column_stack([humidity_index, sunlight_index, humidity_index * sunlight_index])
+    y = ahead(data["mid_price"], days, 10)
+    rows = ~np.isnan(y)
+    return X[rows], y[rows], days[rows], ["humidity_index", "sunlight_index", "production_index"], LinearRegression()
+
+
+def orchid_humidity_next():
+    # data_round2/model5.py, only rows outside the optimal humidity band, the next price
+    from sklearn.linear_model import LinearRegression
+    data = orchid_frame()
+    days = data["day"].to_numpy()
+    penalty = (1 - orchid_features.humidity_penalty(data["humidity"])) * 100
+    y = ahead(data["mid_price"], days, 1)
+    rows = (penalty > 0) & ~np.isnan(y)
+    return penalty[rows].reshape(-1, 1), y[rows], days[rows], ["humidity_penalty"], LinearRegression()
+
+
+def orchid_window():
+    # data_round2/model6.py, the deployed orchid model
+    from sklearn.linear_model import LinearRegression
+    data = orchid_frame()
+    X, y, days = windows(data["mid_price"].to_numpy(), data["day"].to_numpy(), 4)
+    return X, y, days, [f"mid_{i}" for i in range(4)], LinearRegression()
+
+
+def orchid_weather_change():
+    # data_round2/model7.py, the price change 100 rows ahead
+    from sklearn.linear_model import LinearRegression
+    data = orchid_frame()
+    days = data["day"].to_numpy()
+    prices = data["mid_price"].to_numpy()
+    y = ahead(prices, days, 100) - prices
+    rows = ~np.isnan(y)
+    return data[["humidity", "sunlight"]].to_numpy()[rows], y[rows], days[rows], ["humidity", "sunlight"], LinearRegression()
+
+
+EXPERIMENTS = {
+    "starfruit_window": starfruit_window,
+    "basket_window": basket_window,
+    "orchid_forest": orchid_forest,
+    "orchid_fees": orchid_fees,
+    "orchid_production_index": orchid_production_index,
+    "orchid_humidity_next": orchid_humidity_next,
+    "orchid_window": orchid_window,
+    "orchid_weather_change": orchid_weather_change,
+    "orchid_humidity": orchid_humidity,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("experiments", nargs="*", default=list(EXPERIMENTS), help=f"any of {', '.join(EXPERIMENTS)}")
+    parser.add_argument("--scheme", choices=list(SCHEMES) + ["both"], default="both")
+    parser.add_argument("--workers", type=int, default=None, help="processes to use, defaults to the cpu count")
+    parser.add_argument("--no-cache", action="store_true", help="refit every fold")
+    args = parser.parse_args()
+
+    schemes = list(SCHEMES) if args.scheme == "both" else [args.scheme]
+    for name in args.experiments:
+        start = time.perf_counter()
+        X, y, days, features, estimator = EXPERIMENTS[name]()
+        for scheme in schemes:
+            result = cross_validate(name, estimator, X, y, days, features, scheme, args.workers, None if args.no_cache else CACHE_DIR)
+            print(result.summary())
+        print(f"  took {time.perf_counter() - start:.2f}s\n")
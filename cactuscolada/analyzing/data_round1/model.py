@@ -2,6 +2,10 @@ import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LinearRegression
 import numpy as np
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import model_registry
 
 # Read the data from a string, simulating reading from a file
 files = ["prices_round_1_day_-2.csv", "prices_round_1_day_-1.csv", "prices_round_1_day_0.csv"]
@@ -50,4 +54,8 @@ r2 = r2_score(y_test, y_pred)
 
 print("Mean Absolute Error:", mae)
 print("Mean Squared Error:", mse)
-print("R^2 Score:", r2)
\ No newline at end of file
+print("R^2 Score:", r2)
+
+# mid_0 is the oldest price in the window, the order StarfruitTrader's history keeps
+if model_registry.save_requested():
+    model_registry.save_linear("starfruit", model, [f"mid_{i}" for i in range(window_size)], __file__, {"mae": mae, "mse": mse, "r2": r2})
\ No newline at end of file
@@ -0,0 +1,93 @@
+import json
+from typing import List
+
+import numpy as np
+
+LEAF = -1
+
+
+class FlatTree:
+    # a fitted regression tree as parallel arrays, node 0 is the root and leaves have left == right == -1
+    def __init__(self, feature_names: List[str], feature: np.ndarray, threshold: np.ndarray, left: np.ndarray, right: np.ndarray, value: np.ndarray) -> None:
+        self.feature_names = list(feature_names)
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.depth = self.max_depth()
+
+        # plain lists for single-sample scoring, indexing numpy scalars one at a time is slow
+        self._feature = self.feature.tolist()
+        self._threshold = self.threshold.tolist()
+        self._left = self.left.tolist()
+        self._right = self.right.tolist()
+        self._value = self.value.tolist()
+
+    def max_depth(self) -> int:
+        depth = 0
+        level = np.array([0])
+        while True:
+            level = level[self.left[level] != LEAF]
+            if len(level) == 0:
+                return depth
+            level = np.concatenate([self.left[level], self.right[level]])
+            depth += 1
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        # every row walks one level per iteration, so this is depth numpy steps instead of rows python calls
+        X = np.asarray(X, dtype=np.float64)
+        rows = np.arange(len(X))
+        node = np.zeros(len(X), dtype=np.int32)
+        for _ in range(self.depth):
+            feature = self.feature[node]
+            internal = feature != LEAF
+            go_left = X[rows, np.where(internal, feature, 0)] <= self.threshold[node]
+            node = np.where(internal, np.where(go_left, self.left[node], self.right[node]), node)
+        return self.value[node]
+
+    def predict_one(self, *features: float) -> float:
+        node = 0
+        while self._left[node] != LEAF:
+            if features[self._feature[node]] <= self._threshold[node]:
+                node = self._left[node]
+            else:
+                node = self._right[node]
+        return self._value[node]
+
+    def to_dict(self) -> dict:
+        return {
+            "feature_names": self.feature_names,
+            "feature": self._feature,
+            "threshold": self._threshold,
+            "left": self._left,
+            "right": self._right,
+            "value": self._value,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FlatTree":
+        return cls(data["feature_names"], data["feature"], data["threshold"], data["left"], data["right"], data["value"])
+
+
+def from_sklearn(model, feature_names: List[str]) -> "FlatTree":
+    tree_ = model.tree_
+    values = tree_.value[:, 0, :]
+    if values.shape[1] > 1: # classification, same as tree_to_code
+        values = np.argmax(values, axis=1)
+    else:
+        values = values[:, 0]
+    feature = np.where(tree_.children_left == LEAF, LEAF, tree_.feature)
+    return FlatTree(feature_names, feature, tree_.threshold, tree_.children_left, tree_.children_right, values)
+
+
+def export_tree(model, feature_names: List[str], path: str) -> FlatTree:
+    tree = from_sklearn(model, feature_names)
+    with open(path, "w") as file:
+        json.dump(tree.to_dict(), file, separators=(",", ":"))
+    return tree
+
+
+def load_tree(path: str) -> FlatTree:
+    with open(path) as file:
+        return FlatTree.from_dict(json.load(file))
@@ -4,6 +4,10 @@ from sklearn.linear_model import LinearRegression
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
 from sklearn.model_selection import train_test_split
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from orchid_features import humidity_penalty, cutoff_adjustment, cumulative_sunlight
 
 # Load data
 files = ["prices_round_2_day_-1.csv", "prices_round_2_day_0.csv", "prices_round_2_day_1.csv"]
@@ -11,38 +15,17 @@ files = ["prices_round_2_day_-1.csv", "prices_round_2_day_0.csv", "prices_round_
 dataframes = [pd.read_csv(file, delimiter=';') for file in files]
 data = pd.concat(dataframes, ignore_index=True)
 
-def humidity_penalty(humidity):
-    if humidity < 60:
-        return 1 - ((60 - humidity) * 0.004)
-    elif humidity > 80:
-        return 1 - ((humidity - 80) * 0.004)
-    else:
-        return 1
-    
-data['Humidity_Penalty'] = data['HUMIDITY'].apply(humidity_penalty)
+data['Humidity_Penalty'] = humidity_penalty(data['HUMIDITY'])
 
 cutoff = 2600
-data['Above_Cutoff'] = (data['SUNLIGHT'] > cutoff).astype(int)
-data['Count_Above_Cutoff_10K'] = data['Above_Cutoff'].rolling(window=10000, min_periods=1).sum()
-data['Percentage_Above_Cutoff_10K'] = (data['Count_Above_Cutoff_10K'] / 10000) * 100
-
 cutoff_ratio = 7/12 * 100  # Convert the fraction to a percentage
-
-def adjust_value(row):
-    if row['Percentage_Above_Cutoff_10K'] >= cutoff_ratio:
-        return 1
-    else:
-        percent_diff = cutoff_ratio - row['Percentage_Above_Cutoff_10K']
-        adjustment = 1 - (percent_diff * 0.004)
-        return adjustment
-
-data['Adjusted_Value'] = data.apply(adjust_value, axis=1)
+data['Adjusted_Value'] = cutoff_adjustment(data['SUNLIGHT'], 10000, cutoff, cutoff_ratio)
 data['inverse_adjusted_value'] = 1 / data['Adjusted_Value']
 
 data["Production"] = data['Humidity_Penalty']
 data["inverse_production"] = 1 / data["Production"]
 
-data['SUNLIGHT_SUM_10K'] = data['SUNLIGHT'].rolling(window=10000, min_periods=1).sum()
+data['SUNLIGHT_SUM_10K'] = cumulative_sunlight(data['SUNLIGHT'], 10000)
 
 data_filtered = data[data.index > 10000]
 
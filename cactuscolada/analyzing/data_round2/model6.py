@@ -3,6 +3,10 @@ import numpy as np
 from sklearn.linear_model import LinearRegression
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import model_registry
 
 
 files = ["prices_round_2_day_-1.csv", "prices_round_2_day_0.csv", "prices_round_2_day_1.csv"]
@@ -51,4 +55,8 @@ r2 = r2_score(y_test, y_pred)
 
 print("Mean Absolute Error:", mae)
 print("Mean Squared Error:", mse)
-print("R^2 Score:", r2)
\ No newline at end of file
+print("R^2 Score:", r2)
+
+# mid_0 is the oldest price in the window, the order OrchidTrader's history keeps
+if model_registry.save_requested():
+    model_registry.save_linear("orchid", model, [f"mid_{i}" for i in range(window_size)], __file__, {"mae": mae, "mse": mse, "r2": r2})
\ No newline at end of file
@@ -6,44 +6,13 @@ from sklearn.metrics import mean_squared_error, r2_score
 from sklearn.linear_model import HuberRegressor
 import math
 from sklearn.preprocessing import PolynomialFeatures
-
-def humidity_impact(humidity):
-    optimal_range = (60, 80)
-    if optimal_range[0] <= humidity <= optimal_range[1]:
-        return 1.0  # No change in production
-    elif humidity < optimal_range[0]:
-        deviation = optimal_range[0] - humidity
-    else:
-        deviation = humidity - optimal_range[1]
-    
-    # Calculate compounded production drop
-    return 1 - (0.004 * deviation)
-    # return np.power(1 - 0.004, deviation)
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from orchid_features import humidity_penalty, deficit_count, sunlight_impact, future_return
 
 # Example of calculating the production adjustment for a humidity of 50%
-print("Production adjustment for 90% humidity:", humidity_impact(90))
-
-def sunlight_impact(sunlight_data):
-    required_lumens = 2500
-    timestamp_per_hour = 1_000_000 / 12  # Number of timestamps in one hour
-    timestamp_per_ten_minutes = timestamp_per_hour * (10 / 60)  # Number of timestamps in 10 minutes
-
-    # Initialize the deficit count in terms of timestamps
-    deficit_timestamps = 0
-    minute_penalty = 0.04  # 4% drop every 10 minutes
-
-    # Calculate deficit timestamps
-    for lumens in sunlight_data:
-        if lumens < required_lumens:
-            deficit_timestamps += 100  # Each entry corresponds to 100 timestamps
-
-    # Calculate the number of 10-minute intervals in deficit
-    deficit_intervals = deficit_timestamps / timestamp_per_ten_minutes
-
-    # Calculate total production drop
-    production_drop = max(0, np.power(1 - minute_penalty, deficit_intervals))
-
-    return production_drop
+print("Production adjustment for 90% humidity:", float(humidity_penalty(90)))
 
 # Example data: Sunlight readings with timestamps
 example_sunlight_data = [
@@ -51,7 +20,7 @@ example_sunlight_data = [
 ]
 
 # Calculate the production adjustment for the example data
-adjustment_factor = sunlight_impact(example_sunlight_data)
+adjustment_factor = sunlight_impact(deficit_count(example_sunlight_data, len(example_sunlight_data))[-1])
 print("Production adjustment factor:", adjustment_factor)
 
 
@@ -59,32 +28,22 @@ def process_file(file, window_size, future_index):
     df = pd.read_csv(file, delimiter=';')
     print(df.head())  # Verify data format
 
-    X, y = [], []
-    for i in range(window_size, len(df) - future_index):
-        current_price = df.loc[i, 'ORCHIDS']
-        future_price = df.loc[i + future_index, 'ORCHIDS']
-        percentage_change = ((future_price - current_price) / current_price) * 100
-
-        # Calculate sunlight and humidity impacts for the window
-        humidity_impacts = humidity_impact(df.loc[i, 'HUMIDITY'])
-        sunlight_impacts = sunlight_impact(df.loc[i - window_size:i, 'SUNLIGHT'])
-        
-        inv_humidity_impacts = 1 / humidity_impacts
-        inv_sunlight_impacts = 1 / sunlight_impacts
-
-        # Create the feature vector with the windowed data
-        # window_data = df.loc[i - window_size:i - 1]  # Extract the window
-        # window_features = window_data.drop(['ORCHIDS'], axis=1).values.flatten()  # Flatten window data, excluding price
-        
-        # Append impacts to features
-        features = [humidity_impacts] 
-        poly = PolynomialFeatures(degree=5)
-        p_features = np.array([inv_humidity_impacts, inv_sunlight_impacts]).reshape(1, -1)  # Reshape needed for single sample
-        poly_features = poly.fit_transform(p_features)
-        X.append(features)
-        y.append(percentage_change)
-
-    return np.array(X), np.array(y)
+    rows = np.arange(window_size, len(df) - future_index)
+    percentage_change = future_return(df['ORCHIDS'], future_index)[rows]
+
+    # Calculate sunlight and humidity impacts for the window, df.loc[i - window_size:i] is window_size + 1 rows
+    humidity_impacts = humidity_penalty(df['HUMIDITY'])[rows]
+    sunlight_impacts = sunlight_impact(deficit_count(df['SUNLIGHT'], window_size + 1))[rows]
+
+    inv_humidity_impacts = 1 / humidity_impacts
+    inv_sunlight_impacts = 1 / sunlight_impacts
+
+    # Append impacts to features
+    X = np.column_stack([humidity_impacts])
+    poly = PolynomialFeatures(degree=5)
+    poly_features = poly.fit_transform(np.column_stack([inv_humidity_impacts, inv_sunlight_impacts]))
+
+    return X, percentage_change
 
 
 window_size = 1
@@ -87,9 +87,20 @@ def tree_to_code(tree, feature_names, output_file_path):
 # Example usage
 tree_to_code(model, ['SUNLIGHT', 'HUMIDITY'], 'decision_tree_function.py')
 
-from decision_tree_function import tree
-
-test_predictions = [tree(row['SUNLIGHT'], row['HUMIDITY']) for index, row in X_test.iterrows()]
+# flat array version of the same tree, scores the whole test set in one vectorized pass.
+# `modelrf.py --save` registers it as orchid_tree, `model_registry.py deploy orchid_tree ...` hands it to OrchidTrader
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import model_registry
+from flat_tree import FlatTree
+
+artifact = model_registry.tree_artifact(model, ['SUNLIGHT', 'HUMIDITY'])
+if model_registry.save_requested():
+    model_registry.save("orchid_tree", artifact, __file__, {"mae": mae, "mse": mse, "r2": r2})
+flat_tree = FlatTree.from_dict(artifact)
+
+test_predictions = flat_tree.predict(X_test[['SUNLIGHT', 'HUMIDITY']].to_numpy())
 
 mae = mean_absolute_error(y_test, test_predictions)
 mse = mean_squared_error(y_test, test_predictions)
@@ -4,31 +4,14 @@ import matplotlib.pyplot as plt
 from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LinearRegression
 from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from loader import mid_price_frames
 
 # explore the relationship between prices
-files = ["prices_round_3_day_0.csv", "prices_round_3_day_1.csv", "prices_round_3_day_2.csv"]
-
 dataframes = []
-for file in files:
-    datafile = pd.read_csv(file, delimiter=';')
-    
-    pivoted_data = datafile.pivot_table(
-        index=['day', 'timestamp'], 
-        columns='product', 
-        values='mid_price', 
-        aggfunc='first'
-    ).reset_index()
-
-    # Rename columns to make them more descriptive if needed
-    pivoted_data.columns = [
-        'day',
-        'timestamp', 
-        'chocolate_midprice',
-        'basket_midprice', 
-        'rose_midprice', 
-        'strawberry_midprice'
-    ]
-
+for pivoted_data in mid_price_frames(3):
     lag = -1
     pivoted_data['basket_midprice_shifted'] = pivoted_data['basket_midprice'].shift(lag)
     pivoted_data['percent_change_basket_midprice_shifted'] = pivoted_data['basket_midprice_shifted'].pct_change()
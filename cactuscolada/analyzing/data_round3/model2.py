@@ -2,33 +2,15 @@ import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LinearRegression
 import numpy as np
-
-# Read the data from a string, simulating reading from a file
-files = ["prices_round_3_day_0.csv", "prices_round_3_day_1.csv", "prices_round_3_day_2.csv"]
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from loader import mid_price_frames
 
 X = []
 y = []
 
-for file in files:
-    datafile = pd.read_csv(file, delimiter=';')
-    
-    pivoted_data = datafile.pivot_table(
-        index=['day', 'timestamp'], 
-        columns='product', 
-        values='mid_price', 
-        aggfunc='first'
-    ).reset_index()
-
-    # Rename columns to make them more descriptive if needed
-    pivoted_data.columns = [
-        'day',
-        'timestamp', 
-        'chocolate_midprice',
-        'basket_midprice', 
-        'rose_midprice', 
-        'strawberry_midprice'
-    ]
-    
+for pivoted_data in mid_price_frames(3):
     window_size = 40
     for i in range(len(pivoted_data) - window_size):
         X.append(pivoted_data['basket_midprice'][i:i + window_size].values)  # Create input feature window
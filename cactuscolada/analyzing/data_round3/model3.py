@@ -1,41 +1,19 @@
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from loader import mid_price_frames, product_frame
 
-price_files = ["prices_round_3_day_0.csv", "prices_round_3_day_1.csv", "prices_round_3_day_2.csv"]
 trade_files = ["trades_round_3_day_0_nn.csv", "trades_round_3_day_1_nn.csv", "trades_round_3_day_2_nn.csv"]
 
-dataframes = []
-flatframes = []
-for file in price_files:
-    datafile = pd.read_csv(file, delimiter=';')
-    
-    pivoted_data = datafile.pivot_table(
-        index=['day', 'timestamp'], 
-        columns='product', 
-        values='mid_price', 
-        aggfunc='first'
-    ).reset_index()
-
-    # Rename columns to make them more descriptive if needed
-    pivoted_data.columns = [
-        'day',
-        'timestamp', 
-        'chocolate_midprice',
-        'basket_midprice', 
-        'rose_midprice', 
-        'strawberry_midprice'
-    ]
-
-    dataframes.append(pivoted_data)
-    flatframes.append(datafile)
+dataframes = mid_price_frames(3)
 
 price_data = pd.concat(dataframes, ignore_index=True)
 print(price_data)
 print(len(price_data))
 
-flat_data = pd.concat(flatframes, ignore_index=True)
-
 tradeframes = []
 for i, file in enumerate(trade_files):
     datafile = pd.read_csv(file, delimiter=';')
@@ -58,7 +36,7 @@ print(len(trade_data))
 
 # graph of mid prices and trades of strawberry per timestamp
 strawberry_data = trade_data[trade_data['symbol'] == 'STRAWBERRIES']
-strawberry_prices = flat_data[flat_data['product'] == 'STRAWBERRIES']
+strawberry_prices = product_frame(3, 'STRAWBERRIES', ['timestamp', 'bid_price_1', 'ask_price_1', 'mid_price'])
 
 plt.figure(figsize=(14, 8))
 plt.plot(strawberry_prices['timestamp'], strawberry_prices['bid_price_1'], label='strawberry best bid')
@@ -4,31 +4,15 @@ import matplotlib.pyplot as plt
 from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LinearRegression
 from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from loader import mid_price_frames
+import model_registry
 
 # explore the relationship between prices
-files = ["prices_round_3_day_0.csv", "prices_round_3_day_1.csv", "prices_round_3_day_2.csv"]
-
 dataframes = []
-for file in files:
-    datafile = pd.read_csv(file, delimiter=';')
-    
-    pivoted_data = datafile.pivot_table(
-        index=['day', 'timestamp'], 
-        columns='product', 
-        values='mid_price', 
-        aggfunc='first'
-    ).reset_index()
-
-    # Rename columns to make them more descriptive if needed
-    pivoted_data.columns = [
-        'day',
-        'timestamp', 
-        'chocolate_midprice',
-        'basket_midprice', 
-        'rose_midprice', 
-        'strawberry_midprice'
-    ]
-
+for pivoted_data in mid_price_frames(3):
     pivoted_data['combined_midprice'] = (4 * pivoted_data['chocolate_midprice']) + pivoted_data['rose_midprice'] + (6 * pivoted_data['strawberry_midprice'])
     for product in ['chocolate', 'rose', 'strawberry', 'basket', 'combined']:
         pivoted_data[f'change_{product}_midprice'] = pivoted_data[f'{product}_midprice'].diff()
@@ -73,6 +57,24 @@ print("R2:", r2)
 print("model coefficients:", model.coef_)
 print("model intercept:", model.intercept_)
 
+# features named after the GiftItem deviations they weight
+if model_registry.save_requested():
+    model_registry.save_linear("rose", model, ["strawberry_deviation", "chocolate_deviation", "basket_deviation"], __file__, {"mse": mse, "r2": r2})
+
+# the other basket legs the same way, each one's deviation on the other three
+for target, others in [("basket", ["chocolate", "strawberry", "rose"]), ("chocolate", ["basket", "strawberry", "rose"]), ("strawberry", ["basket", "chocolate", "rose"])]:
+    X = data[[f'log_change_{product}_midprice' for product in others]]
+    y = data[f'log_change_{target}_midprice']
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=21)
+    leg_model = LinearRegression()
+    leg_model.fit(X_train, y_train)
+    y_pred = leg_model.predict(X_test)
+    leg_mse = mean_squared_error(y_test, y_pred)
+    leg_r2 = r2_score(y_test, y_pred)
+    print(target, "MSE:", leg_mse, "R2:", leg_r2, "coefficients:", leg_model.coef_, "intercept:", leg_model.intercept_)
+    if model_registry.save_requested():
+        model_registry.save_linear(target, leg_model, [f"{product}_deviation" for product in others], __file__, {"mse": leg_mse, "r2": leg_r2})
+
 
 plt.figure(figsize=(10, 7))
 plt.plot(data['log_change_chocolate_midprice'], label='chocolate', color='orange')
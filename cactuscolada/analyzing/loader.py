@@ -0,0 +1,105 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from market_store import MarketStore, load_round
+
+# short names used for the wide frame columns, e.g. CHOCOLATE mid_price -> chocolate_midprice
+NAMES: Dict[str, str] = {
+    "AMETHYSTS": "amethyst",
+    "STARFRUIT": "starfruit",
+    "ORCHIDS": "orchid",
+    "CHOCOLATE": "chocolate",
+    "STRAWBERRIES": "strawberry",
+    "ROSES": "rose",
+    "GIFT_BASKET": "basket",
+}
+
+BID_VOLUMES = ["bid_volume_1", "bid_volume_2", "bid_volume_3"]
+ASK_VOLUMES = ["ask_volume_1", "ask_volume_2", "ask_volume_3"]
+
+
+def column_name(product: str, column: str) -> str:
+    name = NAMES.get(product, product.lower())
+    if column == "mid_price":
+        return f"{name}_midprice"
+    return f"{name}_{column}"
+
+
+class RoundData:
+    # wide per-product frames over the memmapped store, columns are only materialized when asked for
+    def __init__(self, round_num: int) -> None:
+        self.store: MarketStore = load_round(round_num)
+        self.products = self.store.products
+        self.cache: Dict[Tuple[str, str, int], np.ndarray] = {}
+
+    def values(self, product: str, column: str, day: int = None) -> np.ndarray:
+        key = (product, column, day)
+        if key not in self.cache:
+            if column == "bid_depth":
+                values = sum(self.values(product, volume, day).astype(np.int64) for volume in BID_VOLUMES)
+            elif column == "ask_depth":
+                values = sum(self.values(product, volume, day).astype(np.int64) for volume in ASK_VOLUMES)
+            elif day is None:
+                values = self.store.product(product, [column])[column]
+            else:
+                values = self.store.product_day(product, day, [column])[column]
+            self.cache[key] = values
+        return self.cache[key]
+
+    def aligned(self, day: int = None) -> bool:
+        # every product quotes every timestamp in the round files, so columns can be stacked side by side
+        first = self.products[0]
+        return all(
+            np.array_equal(self.values(first, index, day), self.values(product, index, day))
+            for product in self.products[1:] for index in ["day", "timestamp"]
+        )
+
+    def frame(self, columns: List[str], day: int = None, products: List[str] = None) -> pd.DataFrame:
+        products = products or self.products
+        if not self.aligned(day):
+            return self.pivot(columns, day, products)
+
+        data = {"day": self.values(products[0], "day", day), "timestamp": self.values(products[0], "timestamp", day)}
+        for column in columns:
+            for product in products:
+                data[column_name(product, column)] = self.values(product, column, day)
+        return pd.DataFrame(data)
+
+    def pivot(self, columns: List[str], day: int, products: List[str]) -> pd.DataFrame:
+        pieces = []
+        for product in products:
+            index = pd.MultiIndex.from_arrays([self.values(product, "day", day), self.values(product, "timestamp", day)], names=["day", "timestamp"])
+            pieces.append(pd.DataFrame({column_name(product, column): self.values(product, column, day) for column in columns}, index=index))
+        return pd.concat(pieces, axis=1).sort_index().reset_index()
+
+    def product_frame(self, product: str, columns: List[str], day: int = None) -> pd.DataFrame:
+        return pd.DataFrame({column: self.values(product, column, day) for column in columns})
+
+
+_rounds: Dict[int, RoundData] = {}
+
+
+def round_data(round_num: int) -> RoundData:
+    if round_num not in _rounds:
+        _rounds[round_num] = RoundData(round_num)
+    return _rounds[round_num]
+
+
+def mid_price_frame(round_num: int, day: int = None) -> pd.DataFrame:
+    return round_data(round_num).frame(["mid_price"], day)
+
+
+def mid_price_frames(round_num: int) -> List[pd.DataFrame]:
+    # one frame per day, in day order, like looping over the prices_round_N_day_D files
+    data = round_data(round_num)
+    return [data.frame(["mid_price"], day) for day in data.store.days]
+
+
+def depth_frame(round_num: int, day: int = None) -> pd.DataFrame:
+    return round_data(round_num).frame(["bid_depth", "ask_depth"], day)
+
+
+def product_frame(round_num: int, product: str, columns: List[str], day: int = None) -> pd.DataFrame:
+    return round_data(round_num).product_frame(product, columns, day)
@@ -0,0 +1,155 @@
+import argparse
+import glob
+import json
+import os
+import re
+import time
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+ANALYZING_DIR = os.path.dirname(os.path.abspath(__file__))
+STORE_VERSION = 1
+
+# order book columns, round 2 only has the orchid observation columns
+PRICE_COLUMNS = ["bid_price_1", "bid_price_2", "bid_price_3", "ask_price_1", "ask_price_2", "ask_price_3", "mid_price", "profit_and_loss"]
+VOLUME_COLUMNS = ["bid_volume_1", "bid_volume_2", "bid_volume_3", "ask_volume_1", "ask_volume_2", "ask_volume_3"]
+OBSERVATION_COLUMNS = ["transport_fees", "export_tariff", "import_tariff", "sunlight", "humidity"]
+
+
+def round_dir(round_num: int) -> str:
+    return os.path.join(ANALYZING_DIR, f"data_round{round_num}")
+
+
+def store_dir(round_num: int) -> str:
+    return os.path.join(round_dir(round_num), "store")
+
+
+def price_files(round_num: int) -> List[str]:
+    files = glob.glob(os.path.join(round_dir(round_num), f"prices_round_{round_num}_day_*.csv"))
+    return sorted(files, key=lambda path: int(re.search(r"day_(-?\d+)", path).group(1)))
+
+
+def read_prices(path: str) -> pd.DataFrame:
+    df = pd.read_csv(path, sep=";")
+    if "product" not in df.columns:
+        # round 2: one orchid price per row plus the conversion observations
+        df = df.rename(columns={"DAY": "day", "ORCHIDS": "mid_price"}).rename(columns=str.lower)
+        df["product"] = "ORCHIDS"
+    return df
+
+
+def build(round_num: int) -> None:
+    files = price_files(round_num)
+    df = pd.concat([read_prices(path) for path in files], ignore_index=True)
+
+    products = sorted(df["product"].unique())
+    df["product_code"] = df["product"].map({product: code for code, product in enumerate(products)})
+    # rows sorted by (product, day, timestamp) so every product is one contiguous slice
+    df = df.sort_values(["product_code", "day", "timestamp"], kind="stable").reset_index(drop=True)
+
+    columns = {
+        "day": df["day"].to_numpy(np.int16),
+        "timestamp": df["timestamp"].to_numpy(np.int32),
+        "product": df["product_code"].to_numpy(np.int8),
+    }
+    for column in PRICE_COLUMNS + OBSERVATION_COLUMNS:
+        if column in df.columns:
+            columns[column] = df[column].to_numpy(np.float64)
+    for column in VOLUME_COLUMNS:
+        if column in df.columns:
+            columns[column] = df[column].fillna(0).to_numpy(np.int32)
+
+    codes = columns["product"]
+    offsets = np.searchsorted(codes, np.arange(len(products) + 1)).tolist()
+
+    directory = store_dir(round_num)
+    os.makedirs(directory, exist_ok=True)
+    for column, values in columns.items():
+        np.save(os.path.join(directory, column + ".npy"), values)
+
+    meta = {
+        "version": STORE_VERSION,
+        "products": products,
+        "offsets": offsets,
+        "columns": list(columns.keys()),
+        "days": sorted(int(day) for day in np.unique(columns["day"])),
+        "sources": {os.path.basename(path): os.path.getmtime(path) for path in files},
+    }
+    with open(os.path.join(directory, "meta.json"), "w") as file:
+        json.dump(meta, file, indent=1)
+
+
+def is_stale(round_num: int) -> bool:
+    path = os.path.join(store_dir(round_num), "meta.json")
+    if not os.path.exists(path):
+        return True
+    with open(path) as file:
+        meta = json.load(file)
+    sources = {os.path.basename(path): os.path.getmtime(path) for path in price_files(round_num)}
+    return meta.get("version") != STORE_VERSION or meta["sources"] != sources
+
+
+class MarketStore:
+    # read-only view over one round; every array is a memmap, slices never copy
+    def __init__(self, round_num: int) -> None:
+        directory = store_dir(round_num)
+        with open(os.path.join(directory, "meta.json")) as file:
+            meta = json.load(file)
+        self.round_num = round_num
+        self.products: List[str] = meta["products"]
+        self.days: List[int] = meta["days"]
+        self.columns: List[str] = meta["columns"]
+        self.offsets: List[int] = meta["offsets"]
+        self.arrays: Dict[str, np.memmap] = {
+            column: np.load(os.path.join(directory, column + ".npy"), mmap_mode="r") for column in self.columns
+        }
+
+    def __len__(self) -> int:
+        return len(self.arrays["timestamp"])
+
+    def column(self, name: str) -> np.memmap:
+        return self.arrays[name]
+
+    def product(self, product: str, columns: List[str] = None) -> Dict[str, np.memmap]:
+        code = self.products.index(product)
+        start, end = self.offsets[code], self.offsets[code + 1]
+        return {name: self.arrays[name][start:end] for name in (columns or self.columns) if name != "product"}
+
+    def product_day(self, product: str, day: int, columns: List[str] = None) -> Dict[str, np.memmap]:
+        # days are sorted inside a product, so a day is a contiguous slice too
+        arrays = self.product(product, list(set(columns or self.columns) | {"day"}))
+        start, end = np.searchsorted(arrays["day"], [day, day + 1])
+        return {name: values[start:end] for name, values in arrays.items() if columns is None or name in columns}
+
+
+def load_round(round_num: int, rebuild: bool = True) -> MarketStore:
+    if rebuild and is_stale(round_num):
+        build(round_num)
+    return MarketStore(round_num)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("rounds", type=int, nargs="+")
+    args = parser.parse_args()
+
+    for round_num in args.rounds:
+        start = time.perf_counter()
+        build(round_num)
+        built = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for path in price_files(round_num):
+            read_prices(path)
+        csv_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        store = load_round(round_num)
+        mids = {product: store.product(product, ["mid_price"])["mid_price"] for product in store.products}
+        store_time = time.perf_counter() - start
+
+        print(f"round {round_num}: {len(store)} rows, {len(store.products)} products, built in {built:.2f}s")
+        print(f"  read_csv: {csv_time * 1000:8.1f} ms")
+        print(f"  store:    {store_time * 1000:8.1f} ms")
@@ -0,0 +1,127 @@
+import argparse
+import json
+import os
+import re
+import sys
+from typing import Any, Dict, List
+
+ANALYZING_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.join(ANALYZING_DIR, "models")
+TRAITOR_PATH = os.path.join(ANALYZING_DIR, "..", "trading", "traitor.py")
+
+# traitor.py is uploaded as a single file and can't read artifacts at runtime, so deploy
+# rewrites the MODELS literal between these two lines and the traders load from that.
+# the loop is: rerun a model script with --save, `model_registry.py deploy`, backtest. that changes what trades,
+# so a retrain and its deploy go in their own commit, never alongside a refactor.
+BEGIN_MARKER = "# models: generated by analyzing/model_registry.py deploy, edit the artifacts in analyzing/models instead"
+END_MARKER = "# end models"
+
+Artifact = Dict[str, Any]
+
+
+def artifact_path(name: str) -> str:
+    return os.path.join(MODELS_DIR, name + ".json")
+
+
+def source_name(source: str) -> str:
+    # data_round1/model.py rather than wherever the script was run from
+    return os.path.relpath(os.path.abspath(source), ANALYZING_DIR) if source else None
+
+
+def save_requested() -> bool:
+    # model scripts only write artifacts when run with --save, fitting on its own never touches what deploy ships
+    return "--save" in sys.argv[1:]
+
+
+def save(name: str, artifact: Artifact, source: str = None, metrics: Dict[str, float] = None) -> Artifact:
+    artifact["meta"] = {"source": source_name(source), "metrics": metrics or {}}
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    with open(artifact_path(name), "w") as file:
+        json.dump(artifact, file, indent=1)
+    print(f"saved {name} to {os.path.relpath(artifact_path(name))}")
+    return artifact
+
+
+def linear_artifact(model: Any, features: List[str]) -> Artifact:
+    # anything with coef_ and intercept_, e.g. LinearRegression or HuberRegressor
+    coefficients = [float(value) for value in model.coef_]
+    if len(coefficients) != len(features):
+        raise ValueError(f"{len(coefficients)} coefficients for {len(features)} features")
+    return {"kind": "linear", "features": list(features), "coefficients": coefficients, "intercept": float(model.intercept_)}
+
+
+def tree_artifact(model: Any, features: List[str]) -> Artifact:
+    sys.path.append(os.path.join(ANALYZING_DIR, "data_round2"))
+    from flat_tree import from_sklearn
+
+    tree = from_sklearn(model, features).to_dict()
+    tree["kind"] = "tree"
+    return tree
+
+
+def save_linear(name: str, model: Any, features: List[str], source: str = None, metrics: Dict[str, float] = None) -> Artifact:
+    return save(name, linear_artifact(model, features), source, metrics)
+
+
+def save_tree(name: str, model: Any, features: List[str], source: str = None, metrics: Dict[str, float] = None) -> Artifact:
+    return save(name, tree_artifact(model, features), source, metrics)
+
+
+def load(name: str) -> Artifact:
+    with open(artifact_path(name)) as file:
+        return json.load(file)
+
+
+def names() -> List[str]:
+    if not os.path.isdir(MODELS_DIR):
+        return []
+    return sorted(file[:-len(".json")] for file in os.listdir(MODELS_DIR) if file.endswith(".json"))
+
+
+def runtime_fields(artifact: Artifact) -> Artifact:
+    # what the traders need, the meta block stays in the artifact
+    return {key: value for key, value in artifact.items() if key != "meta"}
+
+
+def render(models: Dict[str, Artifact]) -> str:
+    lines = [BEGIN_MARKER, "MODELS: Dict[str, Dict[str, Any]] = {"]
+    for name, artifact in models.items():
+        lines.append(f"    {json.dumps(name)}: {json.dumps(runtime_fields(artifact), separators=(',', ':'))},")
+    lines.append("}")
+    lines.append(END_MARKER)
+    return "\n".join(lines)
+
+
+def deploy(model_names: List[str] = None, path: str = TRAITOR_PATH) -> None:
+    model_names = model_names or names()
+    block = render({name: load(name) for name in model_names})
+    with open(path) as file:
+        source = file.read()
+    pattern = re.compile(re.escape(BEGIN_MARKER) + ".*?" + re.escape(END_MARKER), re.DOTALL)
+    if not pattern.search(source):
+        raise ValueError(f"{path} has no models block to replace")
+    with open(path, "w") as file:
+        file.write(pattern.sub(lambda match: block, source, count=1))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list")
+    show = subparsers.add_parser("show")
+    show.add_argument("name")
+    deploy_parser = subparsers.add_parser("deploy", help="write artifacts into traitor.py's MODELS block")
+    deploy_parser.add_argument("names", nargs="*", help="defaults to every artifact")
+    deploy_parser.add_argument("--path", default=TRAITOR_PATH)
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for name in names():
+            artifact = load(name)
+            meta = artifact.get("meta", {})
+            print(f"{name:<16} {artifact['kind']:<7} {len(artifact['features'] if artifact['kind'] == 'linear' else artifact['feature_names']):>3} features  {meta.get('source')}")
+    elif args.command == "show":
+        print(json.dumps(load(args.name), indent=1))
+    else:
+        deploy(args.names, args.path)
+        print(f"deployed {', '.join(args.names or names())} to {os.path.normpath(args.path)}")
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+# orchid production from the round 2 brief: production drops 4% for every 10 minutes of sunlight
+# under 2500 lumens, and 0.4% for every humidity point outside 60-80%
+REQUIRED_LUMENS = 2500
+OPTIMAL_HUMIDITY = (60, 80)
+HUMIDITY_RATE = 0.004
+SUNLIGHT_PENALTY = 0.04
+TIMESTAMPS_PER_ROW = 100
+TIMESTAMPS_PER_TEN_MINUTES = 1_000_000 / 12 * (10 / 60) # a day is 12 hours of 1,000,000 timestamps
+
+
+def rolling_sum(values, window: int) -> np.ndarray:
+    # sum of the last window values including the current one, shorter at the start like rolling(min_periods=1)
+    sums = np.cumsum(np.asarray(values, dtype=np.float64))
+    out = sums.copy()
+    out[window:] = sums[window:] - sums[:-window]
+    return out
+
+
+def humidity_penalty(humidity) -> np.ndarray:
+    humidity = np.asarray(humidity, dtype=np.float64)
+    low, high = OPTIMAL_HUMIDITY
+    deviation = np.maximum(low - humidity, 0) + np.maximum(humidity - high, 0)
+    return 1 - HUMIDITY_RATE * deviation
+
+
+def deficit_count(sunlight, window: int, required: float = REQUIRED_LUMENS) -> np.ndarray:
+    # readings under the required lumens among the last window rows
+    return rolling_sum(np.asarray(sunlight) < required, window)
+
+
+def sunlight_impact(deficit_rows) -> np.ndarray:
+    intervals = np.asarray(deficit_rows, dtype=np.float64) * TIMESTAMPS_PER_ROW / TIMESTAMPS_PER_TEN_MINUTES
+    return np.maximum(0, np.power(1 - SUNLIGHT_PENALTY, intervals))
+
+
+def cutoff_adjustment(sunlight, window: int = 10000, cutoff: float = 2600, ratio: float = 7 / 12 * 100) -> np.ndarray:
+    # share of the last window readings above the cutoff, penalised HUMIDITY_RATE per point under ratio
+    percentage = rolling_sum(np.asarray(sunlight) > cutoff, window) / window * 100
+    return np.where(percentage >= ratio, 1.0, 1 - (ratio - percentage) * HUMIDITY_RATE)
+
+
+def cumulative_sunlight(sunlight, window: int = None) -> np.ndarray:
+    # running total, or the rolling sum over the last window readings
+    if window is None:
+        return np.cumsum(np.asarray(sunlight, dtype=np.float64))
+    return rolling_sum(sunlight, window)
+
+
+def production_factor(humidity, sunlight, window: int) -> np.ndarray:
+    return humidity_penalty(humidity) * sunlight_impact(deficit_count(sunlight, window))
+
+
+def future_return(prices, horizon: int) -> np.ndarray:
+    # percentage change horizon rows ahead, nan where that is past the end
+    prices = np.asarray(prices, dtype=np.float64)
+    out = np.full(len(prices), np.nan)
+    out[:-horizon] = (prices[horizon:] - prices[:-horizon]) / prices[:-horizon] * 100
+    return out
+
+
+def orchid_features(df: pd.DataFrame, window: int = 10000, deficit_window: int = 2, horizon: int = 100,
+                    price: str = "ORCHIDS", sunlight: str = "SUNLIGHT", humidity: str = "HUMIDITY") -> pd.DataFrame:
+    # every feature for one contiguous run of rows, defaults are the raw round 2 csv columns
+    deficits = deficit_count(df[sunlight], deficit_window)
+    return pd.DataFrame({
+        "humidity_penalty": humidity_penalty(df[humidity]),
+        "deficit_count": deficits,
+        "sunlight_impact": sunlight_impact(deficits),
+        "production": production_factor(df[humidity], df[sunlight], deficit_window),
+        "cutoff_adjustment": cutoff_adjustment(df[sunlight], window),
+        "sunlight_sum": cumulative_sunlight(df[sunlight], window),
+        "future_return": future_return(df[price], horizon),
+    }, index=df.index)
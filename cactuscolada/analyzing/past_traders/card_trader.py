@@ -5,15 +5,57 @@ from collections import defaultdict
 import random
 import math
 import copy
+import json
 import numpy as np
 
 empty_dict = {'PEARLS' : 0, 'BANANAS' : 0, 'COCONUTS' : 0, 'PINA_COLADAS' : 0, 'BERRIES' : 0, 'DIVING_GEAR' : 0, 'DIP' : 0, 'BAGUETTE': 0, 'UKULELE' : 0, 'PICNIC_BASKET' : 0}
 
+INF = int(1e9)
 
-def def_value():
-    return copy.deepcopy(empty_dict)
+TICK = 100 # timestamps between two runs
+
+# per-tick decay of a counterparty's trade signal, as the old loop multiplied it every tick,
+# and the ticks it takes to halve. anyone not listed never fades
+SIGNAL_DECAY = {'Olivia' : 0.995, 'Pablo' : 0.8, 'Camilla' : 0}
+SIGNAL_HALF_LIFE = {person: math.log(0.5) / math.log(decay) if decay > 0 else 0 for person, decay in SIGNAL_DECAY.items()}
+SIGNAL_STRENGTH = 1.5
+
+
+class DecayedSignals:
+    # (value, timestamp it was last written) per (person, product). the decay since then is applied
+    # when the value is read or written, instead of multiplying every entry on every tick
+    def __init__(self, half_lives, tick=TICK):
+        self.half_lives = half_lives
+        self.decay = {person: 0.5 ** (1 / half_life) if half_life > 0 else 0 for person, half_life in half_lives.items()}
+        self.tick = tick
+        self.values = {}
+
+    def get(self, person, product, timestamp):
+        entry = self.values.get((person, product))
+        if entry is None:
+            return 0
+        value, updated = entry
+        return value * self.decay.get(person, 1) ** ((timestamp - updated) // self.tick)
+
+    def set(self, person, product, value, timestamp):
+        self.values[(person, product)] = (value, timestamp)
+
+    def add(self, person, product, value, timestamp):
+        self.set(person, product, self.get(person, product, timestamp) + value, timestamp)
+
+    def checkpoint(self):
+        return json.dumps([[person, product, value, updated] for (person, product), (value, updated) in self.values.items()], separators=(",", ":"))
+
+    def restore(self, traderData):
+        try:
+            data = json.loads(traderData) if traderData else []
+        except ValueError:
+            return
+        if not isinstance(data, list):
+            return
+        for person, product, value, updated in data:
+            self.values[(person, product)] = (value, updated)
 
-INF = int(1e9)
 
 class Trader:
 
@@ -21,8 +63,8 @@ class Trader:
     POSITION_LIMIT = {'PEARLS' : 20, 'BANANAS' : 20, 'COCONUTS' : 600, 'PINA_COLADAS' : 300, 'BERRIES' : 250, 'DIVING_GEAR' : 50, 'DIP' : 300, 'BAGUETTE': 150, 'UKULELE' : 70, 'PICNIC_BASKET' : 70}
     volume_traded = copy.deepcopy(empty_dict)
 
-    person_position = defaultdict(def_value)
-    person_actvalof_position = defaultdict(def_value)
+    signals = DecayedSignals(SIGNAL_HALF_LIFE)
+    restored = False
 
     cpnl = defaultdict(lambda : 0)
     bananas_cache = []
@@ -336,12 +378,12 @@ class Trader:
                 self.cont_buy_basket_unfill += 2
                 pb_pos += vol
 
-        if int(round(self.person_position['Olivia']['UKULELE'])) > 0:
+        if int(round(self.signals.get('Olivia', 'UKULELE', self.timestamp))) > 0:
 
             val_ord = self.POSITION_LIMIT['UKULELE'] - uku_pos
             if val_ord > 0:
                 orders['UKULELE'].append(Order('UKULELE', worst_sell['UKULELE'], val_ord))
-        if int(round(self.person_position['Olivia']['UKULELE'])) < 0:
+        if int(round(self.signals.get('Olivia', 'UKULELE', self.timestamp))) < 0:
 
             val_ord = -(self.POSITION_LIMIT['UKULELE'] + uku_neg)
             if val_ord < 0:
@@ -426,10 +468,10 @@ class Trader:
             elif self.first_berries == 0 or self.start_berries == 0:
                 self.close_berries = True
 
-        if int(round(self.person_position['Olivia']['BERRIES'])) > 0:
+        if int(round(self.signals.get('Olivia', 'BERRIES', timestamp))) > 0:
             self.buy_berries = True
             self.sell_berries = False
-        if int(round(self.person_position['Olivia']['BERRIES'])) < 0:
+        if int(round(self.signals.get('Olivia', 'BERRIES', timestamp))) < 0:
             self.sell_berries = True
             self.buy_berries = False
 
@@ -462,10 +504,10 @@ class Trader:
         if product == "BANANAS":
             return self.compute_orders_regression(product, order_depth, acc_bid, acc_ask, self.POSITION_LIMIT[product])
         
-    def run(self, state: TradingState) -> Dict[str, List[Order]]:
+    def run(self, state: TradingState):
         """
         Only method required. It takes all buy and sell orders for all symbols as an input,
-        and outputs a list of orders to be sent
+        and outputs a list of orders to be sent, no conversions, and the signals as traderData
         """
         # Initialize the method output dict as an empty dict
         result = {'PEARLS' : [], 'BANANAS' : [], 'COCONUTS' : [], 'PINA_COLADAS' : [], 'DIVING_GEAR' : [], 'BERRIES' : [], 'DIP' : [], 'BAGUETTE' : [], 'UKULELE' : [], 'PICNIC_BASKET' : []}
@@ -480,6 +522,11 @@ class Trader:
         assert abs(self.position.get('UKULELE', 0)) <= self.POSITION_LIMIT['UKULELE']
 
         timestamp = state.timestamp
+        self.timestamp = timestamp
+
+        if not self.restored:
+            self.signals.restore(state.traderData)
+            self.restored = True
 
         if len(self.bananas_cache) == self.bananas_dim:
             self.bananas_cache.pop(0)
@@ -514,10 +561,8 @@ class Trader:
             for trade in state.market_trades[product]:
                 if trade.buyer == trade.seller:
                     continue
-                self.person_position[trade.buyer][product] = 1.5
-                self.person_position[trade.seller][product] = -1.5
-                self.person_actvalof_position[trade.buyer][product] += trade.quantity
-                self.person_actvalof_position[trade.seller][product] += -trade.quantity
+                self.signals.set(trade.buyer, product, SIGNAL_STRENGTH, timestamp)
+                self.signals.set(trade.seller, product, -SIGNAL_STRENGTH, timestamp)
 
         orders = self.compute_orders_c_and_pc(state.order_depths)
         result['PINA_COLADAS'] += orders['PINA_COLADAS']
@@ -563,18 +608,9 @@ class Trader:
             totpnl += settled_pnl + self.cpnl[product]
             print(f"For product {product}, {settled_pnl + self.cpnl[product]}, {(settled_pnl+self.cpnl[product])/(self.volume_traded[product]+1e-20)}")
 
-        for person in self.person_position.keys():
-            for val in self.person_position[person].keys():
-                
-                if person == 'Olivia':
-                    self.person_position[person][val] *= 0.995
-                if person == 'Pablo':
-                    self.person_position[person][val] *= 0.8
-                if person == 'Camilla':
-                    self.person_position[person][val] *= 0
-
         print(f"Timestamp {timestamp}, Total PNL ended up being {totpnl}")
         # print(f'Will trade {result}')
         print("End transmission")
-                
-        return result
\ No newline at end of file
+
+        traderData = self.signals.checkpoint() # delivered back as state.traderData, restored on the first tick after a restart
+        return result, 0, traderData
\ No newline at end of file
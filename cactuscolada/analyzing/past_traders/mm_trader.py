@@ -1,50 +1,32 @@
 from analyzing.past_traders.datamodel import *
-from typing import List
+from typing import Dict, List
 import json
 from typing import Any
 import numpy as np
 
 class Trader:
     def __init__(self):
-        self.price_history = {}  # Track recent trade prices
         self.sma_period = 100  # Example: Calculate SMA over the last 10 prices
+        self.short_term_period = 10
+        self.indicators = IndicatorEngine(self.short_term_period, self.sma_period)
+        self.restored = False
         self.max_position = 20
 
     def update_price_history(self, product, price):
-        if product not in self.price_history:
-            self.price_history[product] = []
-        self.price_history[product].append(price)
-        if len(self.price_history[product]) > self.sma_period:
-            self.price_history[product].pop(0)
+        self.indicators.update(product, price)
     
     def get_market_trend(self, product, current_price):
-        if product not in self.price_history or len(self.price_history[product]) < self.sma_period:
-            return 0
-        
-        prices = self.price_history[product]
-        short_term_period = 10
-        long_term_period = 100
-
-        if len(prices) < long_term_period:
+        indicators = self.indicators.get(product)
+        if indicators is None or not indicators.ready():
             return 0
 
-        short_term_ema = self.exponential_moving_average(prices, short_term_period)[-1]
-        long_term_ema = self.exponential_moving_average(prices, long_term_period)[-1]
-
         # Trend strength based on the difference between short and long-term EMAs
-        ema_difference = short_term_ema - long_term_ema
+        ema_difference = indicators.crossover()
         normalized_difference = ema_difference / current_price  # Normalize by the current price for scale
 
         trend_strength = np.clip(normalized_difference * 1000, -1, 1)  # Adjust multiplier as needed for sensitivity
 
         return trend_strength
-
-    def exponential_moving_average(self, prices, period):
-        ema = [sum(prices[:period]) / period]
-        multiplier = 2 / (period + 1)
-        for price in prices[period:]:
-            ema.append((price - ema[-1]) * multiplier + ema[-1])
-        return ema
     
     def adjust_inventory_based_on_trend(self, product, current_price):
         market_trend = self.get_market_trend(product, current_price)
@@ -87,6 +69,10 @@ class Trader:
 
     
     def run(self, state: TradingState):
+        if not self.restored:
+            self.indicators.restore(state.traderData)
+            self.restored = True
+
         result = {}
         for product in state.order_depths:
             order_depth: OrderDepth = state.order_depths[product]
@@ -104,13 +90,205 @@ class Trader:
             
             result[product] = orders
     
-        traderData = "SAMPLE" # String value holding Trader state data required. It will be delivered as TradingState.traderData on next execution.
+        traderData = self.indicators.checkpoint() # String value holding Trader state data required. It will be delivered as TradingState.traderData on next execution.
         
         conversions = 1
         logger.flush(state, result, conversions, traderData)
         return result, conversions, traderData
     
 
+class PriceHistory:
+    # fixed-capacity ring buffer, oldest value first. every value is written twice so the
+    # window values[start:start + count] is always one contiguous slice, no shifting or copying.
+    __slots__ = ("capacity", "values", "start", "count", "total", "ema", "alpha")
+
+    def __init__(self, capacity: int, ema_period: int = None) -> None:
+        self.capacity = capacity
+        self.values = np.zeros(2 * capacity)
+        self.start = 0
+        self.count = 0
+        self.total = 0.0 # rolling sum of the window
+        self.ema = None
+        self.alpha = 2 / ((ema_period or capacity) + 1)
+
+    def append(self, value: float) -> None:
+        if self.count == self.capacity:
+            slot = self.start # overwrite the oldest value
+            self.total -= float(self.values[slot])
+            self.start = (self.start + 1) % self.capacity
+        else:
+            slot = self.count
+            self.count += 1
+        self.values[slot] = value
+        self.values[slot + self.capacity] = value
+        self.total += value
+        self.ema = value if self.ema is None else self.ema + self.alpha * (value - self.ema)
+
+    def window(self) -> np.ndarray:
+        return self.values[self.start:self.start + self.count]
+
+    def full(self) -> bool:
+        return self.count == self.capacity
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else None
+
+    def predict(self, coefficients: List[float], intercept: float) -> float:
+        # linear model over the window, coefficients[0] weights the oldest value
+        return intercept + float(np.dot(self.window(), coefficients))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def checkpoint(self) -> List[Any]:
+        return [self.window().tolist(), self.ema]
+
+    def restore(self, data: List[Any]) -> None:
+        values, ema = data
+        self.start = 0
+        self.count = 0
+        self.total = 0.0
+        for value in values[-self.capacity:]:
+            self.append(value)
+        self.ema = ema
+
+
+class EMA:
+    # seeded with the average of the first period prices, then one multiply per price
+    __slots__ = ("period", "multiplier", "count", "value")
+
+    def __init__(self, period: int) -> None:
+        self.period = period
+        self.multiplier = 2 / (period + 1)
+        self.count = 0
+        self.value = 0.0
+
+    def update(self, price: float) -> None:
+        if self.count < self.period:
+            self.count += 1
+            self.value += (price - self.value) / self.count # running average until the seed is complete
+        else:
+            self.value += (price - self.value) * self.multiplier
+
+    def ready(self) -> bool:
+        return self.count >= self.period
+
+
+class RollingStats:
+    # mean and variance of the last window prices, updated with welford's sliding form so nothing is re-summed
+    __slots__ = ("history", "mean", "m2")
+
+    def __init__(self, window: int) -> None:
+        self.history = PriceHistory(window)
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, price: float) -> None:
+        history = self.history
+        if history.full():
+            oldest = float(history.window()[0])
+            old_mean = self.mean
+            self.mean += (price - oldest) / history.capacity
+            self.m2 += (price - oldest) * (price - self.mean + oldest - old_mean)
+        else:
+            delta = price - self.mean
+            self.mean += delta / (history.count + 1)
+            self.m2 += delta * (price - self.mean)
+        history.append(price)
+
+    def variance(self) -> float:
+        count = len(self.history)
+        return max(self.m2, 0.0) / (count - 1) if count > 1 else 0.0
+
+    def ready(self) -> bool:
+        return self.history.full()
+
+    def checkpoint(self) -> List[Any]:
+        return [len(self.history), self.mean]
+
+    def restore(self, data: List[Any]) -> None:
+        # the window itself isn't kept: it restarts flat at the mean, so the mean and variance are exact again once it has rolled over
+        count, mean = data
+        self.history = PriceHistory(self.history.capacity)
+        for _ in range(min(int(count), self.history.capacity)):
+            self.history.append(float(mean))
+        self.mean = float(mean)
+        self.m2 = 0.0
+
+
+class Indicators:
+    # everything get_market_trend needs for one product, all updated in one call per price.
+    # an ema of period n over exactly n prices is their simple average, so the long leg is the rolling mean.
+    __slots__ = ("short_ema", "long", "difference", "cross")
+
+    def __init__(self, short_period: int, long_period: int) -> None:
+        self.short_ema = EMA(short_period)
+        self.long = RollingStats(long_period)
+        self.difference = 0.0
+        self.cross = 0 # +1 when the short leg just crossed above the long one, -1 below
+
+    def update(self, price: float) -> None:
+        self.short_ema.update(price)
+        self.long.update(price)
+        if self.ready():
+            difference = self.crossover()
+            self.cross = (difference > 0) - (difference < 0) if (difference > 0) != (self.difference > 0) else 0
+            self.difference = difference
+
+    def ready(self) -> bool:
+        return self.long.ready() and self.short_ema.ready()
+
+    def crossover(self) -> float:
+        return self.short_ema.value - self.long.mean
+
+    def checkpoint(self) -> List[Any]:
+        return [self.long.checkpoint(), self.short_ema.count, self.short_ema.value, self.difference, self.cross]
+
+    def restore(self, data: List[Any]) -> None:
+        long, count, value, difference, cross = data
+        self.long.restore(long)
+        self.short_ema.count = int(count)
+        self.short_ema.value = float(value)
+        self.difference = float(difference)
+        self.cross = int(cross)
+
+
+class IndicatorEngine:
+    def __init__(self, short_period: int, long_period: int) -> None:
+        self.short_period = short_period
+        self.long_period = long_period
+        self.products: Dict[Symbol, Indicators] = {}
+
+    def get(self, product: Symbol) -> Indicators:
+        return self.products.get(product)
+
+    def update(self, product: Symbol, price: float) -> Indicators:
+        indicators = self.products.get(product)
+        if indicators is None:
+            indicators = self.products[product] = Indicators(self.short_period, self.long_period)
+        indicators.update(price)
+        return indicators
+
+    def checkpoint(self) -> str:
+        return json.dumps({product: indicators.checkpoint() for product, indicators in self.products.items()}, separators=(",", ":"))
+
+    def restore(self, traderData: str) -> None:
+        try:
+            data = json.loads(traderData) if traderData else {}
+        except ValueError:
+            return # e.g. the "SAMPLE" placeholder from older versions
+        if not isinstance(data, dict):
+            return
+        products = {}
+        for product, fields in data.items():
+            indicators = products[product] = Indicators(self.short_period, self.long_period)
+            try:
+                indicators.restore(fields)
+            except (TypeError, ValueError):
+                return # valid json but not a checkpoint of ours, start from scratch
+        self.products = products
+
+
 class Logger:
     def __init__(self) -> None:
         self.logs = ""
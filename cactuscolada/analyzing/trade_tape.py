@@ -0,0 +1,136 @@
+import argparse
+import glob
+import os
+import re
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from market_store import round_dir
+
+DAY_LENGTH = 1_000_000 # timestamps per day, days are laid end to end on one clock
+
+
+def tape_files(round_num: int) -> List[str]:
+    files = glob.glob(os.path.join(round_dir(round_num), f"trades_round_{round_num}_day_*_nn.csv"))
+    return sorted(files, key=lambda path: int(re.search(r"day_(-?\d+)", path).group(1)))
+
+
+def read_tapes(round_num: int) -> pd.DataFrame:
+    frames = []
+    for path in tape_files(round_num):
+        df = pd.read_csv(path, sep=";", dtype={"buyer": str, "seller": str})
+        df["day"] = int(re.search(r"day_(-?\d+)", path).group(1))
+        frames.append(df)
+    df = pd.concat(frames, ignore_index=True)
+    df[["buyer", "seller"]] = df[["buyer", "seller"]].fillna("") # the _nn tapes have no names
+    return df
+
+
+class TradeTape:
+    # one round of market trades as flat arrays, with two indexes:
+    #   by symbol: rows sorted by (symbol, clock), one contiguous slice per symbol
+    #   by counterparty: one row per side of a named trade, sorted by (person, symbol, clock), with the
+    #   running signed quantity so a position as of any time is one binary search
+    def __init__(self, df: pd.DataFrame) -> None:
+        self.days: List[int] = sorted(int(day) for day in df["day"].unique())
+        self.symbols: List[str] = sorted(df["symbol"].unique())
+        clock = (df["day"].to_numpy(np.int64) - self.days[0]) * DAY_LENGTH + df["timestamp"].to_numpy(np.int64)
+        symbol_codes = df["symbol"].map({symbol: code for code, symbol in enumerate(self.symbols)}).to_numpy(np.int32)
+
+        order = np.lexsort((clock, symbol_codes))
+        self.clock = clock[order]
+        self.symbol = symbol_codes[order]
+        self.price = df["price"].to_numpy(np.float64)[order]
+        self.quantity = df["quantity"].to_numpy(np.int64)[order]
+        self.buyer = df["buyer"].to_numpy(object)[order]
+        self.seller = df["seller"].to_numpy(object)[order]
+        self.symbol_offsets = np.searchsorted(self.symbol, np.arange(len(self.symbols) + 1))
+
+        # both sides of every trade between two different named parties
+        named = (self.buyer != "") & (self.seller != "") & (self.buyer != self.seller)
+        people, person_codes = np.unique(np.concatenate([self.buyer[named], self.seller[named]]).astype(str), return_inverse=True)
+        self.people: List[str] = [str(person) for person in people]
+        person_codes = person_codes.astype(np.int32)
+        side_symbol = np.concatenate([self.symbol[named], self.symbol[named]])
+        side_clock = np.concatenate([self.clock[named], self.clock[named]])
+        side_quantity = np.concatenate([self.quantity[named], -self.quantity[named]])
+
+        order = np.lexsort((side_clock, side_symbol, person_codes))
+        self.side_person = person_codes[order]
+        self.side_symbol = side_symbol[order]
+        self.side_clock = side_clock[order]
+        self.side_quantity = side_quantity[order]
+
+        # (person, symbol) -> [start, end) of its slice; the running sum restarts in every slice
+        self.side_offsets: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        keys = self.side_person.astype(np.int64) * len(self.symbols) + self.side_symbol
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.zeros(0, np.int64)
+        ends = np.r_[starts[1:], len(keys)]
+        running = np.cumsum(self.side_quantity)
+        self.side_net = running - np.repeat(np.r_[0, running][starts], ends - starts)
+        for start, end in zip(starts, ends):
+            self.side_offsets[(self.people[self.side_person[start]], self.symbols[self.side_symbol[start]])] = (int(start), int(end))
+
+    def __len__(self) -> int:
+        return len(self.clock)
+
+    def to_clock(self, day: int, timestamp: int) -> int:
+        return (day - self.days[0]) * DAY_LENGTH + timestamp
+
+    def trades(self, symbol: str, start: Tuple[int, int] = None, end: Tuple[int, int] = None) -> pd.DataFrame:
+        # (day, timestamp) bounds, start inclusive and end exclusive
+        code = self.symbols.index(symbol)
+        lo, hi = self.symbol_offsets[code], self.symbol_offsets[code + 1]
+        clock = self.clock[lo:hi]
+        first = np.searchsorted(clock, self.to_clock(*start)) if start else 0
+        last = np.searchsorted(clock, self.to_clock(*end)) if end else len(clock)
+        rows = slice(lo + first, lo + last)
+        return pd.DataFrame({
+            "day": self.clock[rows] // DAY_LENGTH + self.days[0],
+            "timestamp": self.clock[rows] % DAY_LENGTH,
+            "buyer": self.buyer[rows],
+            "seller": self.seller[rows],
+            "price": self.price[rows],
+            "quantity": self.quantity[rows],
+        })
+
+    def net_position(self, person: str, symbol: str, day: int = None, timestamp: int = None) -> int:
+        # what person bought minus sold of symbol up to and including (day, timestamp), or overall
+        if (person, symbol) not in self.side_offsets:
+            return 0
+        start, end = self.side_offsets[(person, symbol)]
+        if day is None:
+            return int(self.side_net[end - 1])
+        i = np.searchsorted(self.side_clock[start:end], self.to_clock(day, timestamp), side="right")
+        return int(self.side_net[start + i - 1]) if i else 0
+
+    def counterparty_volume(self, symbol: str = None) -> pd.DataFrame:
+        # traded volume and net quantity per person, optionally for one symbol
+        rows = self.side_symbol == self.symbols.index(symbol) if symbol else slice(None)
+        person = self.side_person[rows]
+        quantity = self.side_quantity[rows]
+        volume = np.bincount(person, np.abs(quantity), minlength=len(self.people))
+        net = np.bincount(person, quantity, minlength=len(self.people))
+        return pd.DataFrame({"person": self.people, "volume": volume.astype(np.int64), "net": net.astype(np.int64)}).sort_values("volume", ascending=False)
+
+
+def load_tape(round_num: int) -> TradeTape:
+    return TradeTape(read_tapes(round_num))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("rounds", type=int, nargs="+")
+    args = parser.parse_args()
+
+    for round_num in args.rounds:
+        start = time.perf_counter()
+        tape = load_tape(round_num)
+        loaded = time.perf_counter() - start
+        print(f"round {round_num}: {len(tape)} trades, {len(tape.symbols)} symbols, {len(tape.people)} named counterparties, loaded in {loaded * 1000:.1f} ms")
+        for symbol in tape.symbols:
+            trades = tape.trades(symbol)
+            print(f"  {symbol:<14} {len(trades):6} trades  volume {trades['quantity'].sum():8}")
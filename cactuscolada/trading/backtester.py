@@ -0,0 +1,386 @@
+import argparse
+import contextlib
+import importlib
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from datamodel import *
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "analyzing")
+
+LIMITS: Dict[Symbol, int] = {
+    "AMETHYSTS": 20,
+    "STARFRUIT": 20,
+    "ORCHIDS": 100,
+    "CHOCOLATE": 250,
+    "STRAWBERRIES": 350,
+    "ROSES": 60,
+    "GIFT_BASKET": 60,
+}
+
+ROUND_DAYS: Dict[int, List[int]] = {
+    1: [-2, -1, 0],
+    3: [0, 1, 2],
+}
+
+# rounds whose CSVs can't drive Trader.run, and why
+UNREPLAYABLE: Dict[int, str] = {
+    2: "round 2's price files only carry the ORCHIDS mid and the conversion observations, with no order book "
+       "and no conversion bid/ask to fill against; conversion_sim.py replays the orchid strategies instead",
+}
+
+
+class Day:
+    # one prices/trades CSV pair, already split into plain python lists per timestamp
+    def __init__(self, round_num: int, day: int, timestamps: List[int], books: Dict[int, List[Tuple]], trades: Dict[int, List[Trade]]) -> None:
+        self.round_num = round_num
+        self.day = day
+        self.timestamps = timestamps
+        self.books = books
+        self.trades = trades
+        self.products = sorted({row[0] for rows in books.values() for row in rows})
+
+    def order_depths(self, timestamp: int) -> Dict[Symbol, OrderDepth]:
+        order_depths = {}
+        for product, bids, asks, _ in self.books[timestamp]:
+            order_depth = OrderDepth()
+            order_depth.buy_orders = dict(bids)
+            order_depth.sell_orders = dict(asks)
+            order_depths[product] = order_depth
+        return order_depths
+
+    def mid_prices(self, timestamp: int) -> Dict[Symbol, float]:
+        return {row[0]: row[3] for row in self.books[timestamp]}
+
+
+def _levels(prices: np.ndarray, volumes: np.ndarray, sign: int) -> List[List[Tuple[int, int]]]:
+    # prices/volumes are (rows, 3); missing levels are NaN in the CSV
+    present = ~np.isnan(prices)
+    prices = np.where(present, prices, 0).astype(np.int64).tolist()
+    volumes = (sign * np.where(present, volumes, 0)).astype(np.int64).tolist()
+    present = present.tolist()
+    return [
+        [(p, v) for p, v, ok in zip(price_row, volume_row, present_row) if ok]
+        for price_row, volume_row, present_row in zip(prices, volumes, present)
+    ]
+
+
+def check_round(round_num: int) -> None:
+    if round_num in UNREPLAYABLE:
+        raise ValueError(f"can't backtest round {round_num}: {UNREPLAYABLE[round_num]}")
+    if round_num not in ROUND_DAYS:
+        raise ValueError(f"no data for round {round_num}, rounds are {', '.join(map(str, ROUND_DAYS))}")
+
+
+def load_day(round_num: int, day: int, data_dir: str = DATA_DIR) -> Day:
+    check_round(round_num)
+    folder = os.path.join(data_dir, f"data_round{round_num}")
+    prices = pd.read_csv(os.path.join(folder, f"prices_round_{round_num}_day_{day}.csv"), sep=";")
+    prices = prices.sort_values(["timestamp", "product"], kind="stable")
+
+    bid_prices = prices[["bid_price_1", "bid_price_2", "bid_price_3"]].to_numpy(dtype=float)
+    bid_volumes = prices[["bid_volume_1", "bid_volume_2", "bid_volume_3"]].to_numpy(dtype=float)
+    ask_prices = prices[["ask_price_1", "ask_price_2", "ask_price_3"]].to_numpy(dtype=float)
+    ask_volumes = prices[["ask_volume_1", "ask_volume_2", "ask_volume_3"]].to_numpy(dtype=float)
+
+    books: Dict[int, List[Tuple]] = defaultdict(list)
+    rows = zip(
+        prices["timestamp"].tolist(),
+        prices["product"].tolist(),
+        _levels(bid_prices, bid_volumes, 1),
+        _levels(ask_prices, ask_volumes, -1),
+        prices["mid_price"].tolist(),
+    )
+    for timestamp, product, bids, asks, mid_price in rows:
+        books[timestamp].append((product, bids, asks, mid_price))
+
+    trades: Dict[int, List[Trade]] = defaultdict(list)
+    trades_path = os.path.join(folder, f"trades_round_{round_num}_day_{day}_nn.csv")
+    if os.path.exists(trades_path):
+        tape = pd.read_csv(trades_path, sep=";")
+        buyers = tape["buyer"].fillna("").astype(str).tolist()
+        sellers = tape["seller"].fillna("").astype(str).tolist()
+        for timestamp, buyer, seller, symbol, price, quantity in zip(
+            tape["timestamp"].tolist(), buyers, sellers, tape["symbol"].tolist(),
+            tape["price"].round().astype(int).tolist(), tape["quantity"].tolist()
+        ):
+            trades[timestamp].append(Trade(symbol, price, quantity, buyer, seller, timestamp))
+
+    return Day(round_num, day, sorted(books.keys()), books, trades)
+
+
+class BacktestResult:
+    def __init__(self, round_num: int, day: int) -> None:
+        self.round_num = round_num
+        self.day = day
+        self.pnl: Dict[Symbol, float] = {}
+        self.position: Dict[Symbol, int] = {}
+        self.fills: Dict[Symbol, int] = defaultdict(int)
+        self.volume: Dict[Symbol, int] = defaultdict(int)
+        self.rejected: Dict[Symbol, int] = defaultdict(int)
+        self.pnl_history: List[float] = []
+        self.seconds = 0.0
+        self.profiler = None
+
+    def total_pnl(self) -> float:
+        return sum(self.pnl.values())
+
+    def summary(self) -> str:
+        lines = [f"round {self.round_num} day {self.day} ({self.seconds:.2f}s)"]
+        for product in sorted(self.pnl):
+            lines.append(f"  {product:<14} pnl {self.pnl[product]:>12,.1f}  position {self.position.get(product, 0):>5}  fills {self.fills[product]:>5}  volume {self.volume[product]:>6}")
+        lines.append(f"  {'TOTAL':<14} pnl {self.total_pnl():>12,.1f}")
+        return "\n".join(lines)
+
+
+class Exchange:
+    # queue_position puts our passive orders behind the volume already displayed at their price, market
+    # trades at exactly that price have to eat through it first. trades through our price always reach us
+    def __init__(self, day: Day, limits: Dict[Symbol, int] = LIMITS, match_trades: bool = True, queue_position: bool = False) -> None:
+        self.day = day
+        self.limits = limits
+        self.match_trades = match_trades
+        self.queue_position = queue_position
+        self.position: Dict[Symbol, int] = {product: 0 for product in day.products}
+        self.cash: Dict[Symbol, float] = {product: 0.0 for product in day.products}
+        self.listings = {product: {"symbol": product, "product": product, "denomination": "SEASHELLS"} for product in day.products}
+
+    def within_limits(self, product: Symbol, orders: List[Order]) -> bool:
+        # the exchange rejects every order for a product if they could breach the limit together
+        limit = self.limits.get(product, 0)
+        position = self.position.get(product, 0)
+        total_buy = sum(order.quantity for order in orders if order.quantity > 0)
+        total_sell = sum(-order.quantity for order in orders if order.quantity < 0)
+        return position + total_buy <= limit and position - total_sell >= -limit
+
+    def fill(self, product: Symbol, price: int, quantity: int, timestamp: int, result: BacktestResult) -> Trade:
+        self.position[product] += quantity
+        self.cash[product] -= price * quantity
+        result.fills[product] += 1
+        result.volume[product] += abs(quantity)
+        if quantity > 0:
+            return Trade(product, price, quantity, "SUBMISSION", "", timestamp)
+        return Trade(product, price, -quantity, "", "SUBMISSION", timestamp)
+
+    def match(self, timestamp: int, order_depths: Dict[Symbol, OrderDepth], orders: Dict[Symbol, List[Order]], result: BacktestResult) -> Dict[Symbol, List[Trade]]:
+        own_trades: Dict[Symbol, List[Trade]] = defaultdict(list)
+        market_left = {id(trade): trade.quantity for trade in self.day.trades.get(timestamp, [])}
+        queue_ahead: Dict[Tuple[Symbol, int, bool], int] = {}
+
+        for product, product_orders in orders.items():
+            if product not in order_depths:
+                continue
+            if not self.within_limits(product, product_orders):
+                result.rejected[product] += len(product_orders)
+                continue
+
+            order_depth = order_depths[product]
+            for order in product_orders:
+                quantity = order.quantity
+                if quantity > 0:
+                    for price in sorted(order_depth.sell_orders):
+                        if price > order.price or quantity == 0:
+                            break
+                        volume = min(quantity, -order_depth.sell_orders[price])
+                        own_trades[product].append(self.fill(product, price, volume, timestamp, result))
+                        order_depth.sell_orders[price] += volume
+                        if order_depth.sell_orders[price] == 0:
+                            del order_depth.sell_orders[price]
+                        quantity -= volume
+                elif quantity < 0:
+                    for price in sorted(order_depth.buy_orders, reverse=True):
+                        if price < order.price or quantity == 0:
+                            break
+                        volume = min(-quantity, order_depth.buy_orders[price])
+                        own_trades[product].append(self.fill(product, price, -volume, timestamp, result))
+                        order_depth.buy_orders[price] -= volume
+                        if order_depth.buy_orders[price] == 0:
+                            del order_depth.buy_orders[price]
+                        quantity += volume
+
+                if quantity == 0 or not self.match_trades:
+                    continue
+
+                # what's left of the order trades against market trades at or through our price
+                for trade in self.day.trades.get(timestamp, []):
+                    left = market_left[id(trade)]
+                    if trade.symbol != product or left == 0 or quantity == 0:
+                        continue
+                    if (quantity > 0 and trade.price <= order.price) or (quantity < 0 and trade.price >= order.price):
+                        if self.queue_position and trade.price == order.price:
+                            key = (product, order.price, quantity > 0)
+                            if key not in queue_ahead:
+                                queue_ahead[key] = order_depth.buy_orders.get(order.price, 0) if quantity > 0 else -order_depth.sell_orders.get(order.price, 0)
+                            absorbed = min(left, queue_ahead[key])
+                            queue_ahead[key] -= absorbed
+                            market_left[id(trade)] -= absorbed
+                            left -= absorbed
+                            if left == 0:
+                                continue
+                        volume = min(abs(quantity), left)
+                        market_left[id(trade)] -= volume
+                        signed = volume if quantity > 0 else -volume
+                        own_trades[product].append(self.fill(product, order.price, signed, timestamp, result))
+                        quantity -= signed
+
+        return own_trades
+
+    def mark(self, mid_prices: Dict[Symbol, float]) -> Dict[Symbol, float]:
+        return {product: self.cash[product] + self.position[product] * mid_prices.get(product, 0.0) for product in self.position}
+
+
+def run_backtest(trader: Any, day: Day, limits: Dict[Symbol, int] = LIMITS, match_trades: bool = True, quiet: bool = True, profile: bool = False, queue_position: bool = False) -> BacktestResult:
+    # traders with no book in this day's data are dropped, they'd KeyError on the missing symbol
+    if hasattr(trader, "resource_traders"):
+        trader.resource_traders = {symbol: t for symbol, t in trader.resource_traders.items() if symbol in day.products}
+
+    exchange = Exchange(day, limits, match_trades, queue_position)
+    result = BacktestResult(day.round_num, day.day)
+    if profile and hasattr(trader, "profiler"):
+        trader.profiler = sys.modules[type(trader).__module__].Profiler()
+        result.profiler = trader.profiler
+    trader_data = ""
+    own_trades: Dict[Symbol, List[Trade]] = {}
+    previous_timestamp = None
+    mid_prices: Dict[Symbol, float] = {}
+
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.ExitStack() as stack:
+        if quiet:
+            stack.enter_context(contextlib.redirect_stdout(devnull))
+
+        for timestamp in day.timestamps:
+            order_depths = day.order_depths(timestamp)
+            market_trades: Dict[Symbol, List[Trade]] = defaultdict(list)
+            if previous_timestamp is not None:
+                for trade in day.trades.get(previous_timestamp, []):
+                    market_trades[trade.symbol].append(trade)
+
+            state = TradingState(
+                trader_data,
+                timestamp,
+                exchange.listings,
+                order_depths,
+                own_trades,
+                dict(market_trades),
+                dict(exchange.position),
+                Observation({}, {}),
+            )
+            orders, conversions, trader_data = trader.run(state)
+
+            own_trades = exchange.match(timestamp, day.order_depths(timestamp), orders, result)
+            mid_prices = day.mid_prices(timestamp)
+            result.pnl_history.append(sum(exchange.mark(mid_prices).values()))
+            previous_timestamp = timestamp
+
+    result.seconds = time.perf_counter() - start
+    result.pnl = exchange.mark(mid_prices)
+    result.position = dict(exchange.position)
+    return result
+
+
+def load_trader(module_name: str) -> Any:
+    return importlib.import_module(module_name).Trader()
+
+
+class Report:
+    # per-day results merged into per-product totals
+    def __init__(self, results: List[BacktestResult]) -> None:
+        self.results = sorted(results, key=lambda result: (result.round_num, result.day))
+        self.pnl: Dict[Symbol, float] = defaultdict(float)
+        self.fills: Dict[Symbol, int] = defaultdict(int)
+        self.volume: Dict[Symbol, int] = defaultdict(int)
+        self.rejected: Dict[Symbol, int] = defaultdict(int)
+        self.max_abs_position: Dict[Symbol, int] = defaultdict(int)
+        self.profiler = None
+        for result in self.results:
+            if result.profiler is not None:
+                if self.profiler is None:
+                    self.profiler = type(result.profiler)()
+                self.profiler.merge(result.profiler)
+            for product, pnl in result.pnl.items():
+                self.pnl[product] += pnl
+                self.fills[product] += result.fills[product]
+                self.volume[product] += result.volume[product]
+                self.rejected[product] += result.rejected[product]
+                self.max_abs_position[product] = max(self.max_abs_position[product], abs(result.position.get(product, 0)))
+
+    def total_pnl(self) -> float:
+        return sum(self.pnl.values())
+
+    def summary(self) -> str:
+        lines = [result.summary() for result in self.results]
+        lines.append(f"all days ({len(self.results)})")
+        for product in sorted(self.pnl):
+            lines.append(f"  {product:<14} pnl {self.pnl[product]:>12,.1f}  max end position {self.max_abs_position[product]:>5}  fills {self.fills[product]:>6}  volume {self.volume[product]:>7}  rejected {self.rejected[product]:>5}")
+        lines.append(f"  {'TOTAL':<14} pnl {self.total_pnl():>12,.1f}")
+        if self.profiler is not None:
+            lines.append(self.profiler.summary())
+        return "\n".join(lines)
+
+
+def apply_params(trader: Any, params: Dict[str, Dict[str, Any]]) -> None:
+    # params are keyed by Traitor class name, e.g. {"StarfruitTrader": {"edge": 2}}
+    for resource_trader in trader.resource_traders.values():
+        for attribute, value in params.get(type(resource_trader).__name__, {}).items():
+            if not hasattr(resource_trader, attribute):
+                raise AttributeError(f"{type(resource_trader).__name__} has no parameter {attribute}")
+            setattr(resource_trader, attribute, value)
+
+
+def backtest_day(round_num: int, day: int, trader_module: str = "traitor", match_trades: bool = True, params: Dict[str, Dict[str, Any]] = None, profile: bool = False, queue_position: bool = False) -> BacktestResult:
+    # worker entry point, every day gets a fresh Trader so no state leaks between days
+    trader = load_trader(trader_module)
+    if params:
+        apply_params(trader, params)
+    return run_backtest(trader, load_day(round_num, day), match_trades=match_trades, profile=profile, queue_position=queue_position)
+
+
+def run_days(days: List[Tuple[int, int]], trader_module: str = "traitor", match_trades: bool = True, workers: int = None, params: Dict[str, Dict[str, Any]] = None, profile: bool = False, queue_position: bool = False) -> Report:
+    if workers == 1 or len(days) == 1:
+        return Report([backtest_day(round_num, day, trader_module, match_trades, params, profile, queue_position) for round_num, day in days])
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(backtest_day, round_num, day, trader_module, match_trades, params, profile, queue_position) for round_num, day in days]
+        return Report([future.result() for future in futures])
+
+
+def parse_days(specs: List[str]) -> List[Tuple[int, int]]:
+    # "1" is every day of round 1, "3:2" is only round 3 day 2
+    days = []
+    for spec in specs:
+        round_num, _, day = spec.partition(":")
+        check_round(int(round_num))
+        if day:
+            days.append((int(round_num), int(day)))
+        else:
+            days.extend((int(round_num), day_num) for day_num in ROUND_DAYS[int(round_num)])
+    return days
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("days", nargs="+", help="rounds or round:day pairs, e.g. 1 3:0")
+    parser.add_argument("--trader", default="traitor", help="module with the Trader class")
+    parser.add_argument("--no-trade-matching", action="store_true", help="only fill against the order book")
+    parser.add_argument("--queue", action="store_true", help="passive orders queue behind the displayed volume at their price")
+    parser.add_argument("--workers", type=int, default=None, help="processes to use, defaults to the cpu count")
+    parser.add_argument("--profile", action="store_true", help="time every Trader.run stage and print latency percentiles")
+    args = parser.parse_args()
+
+    try:
+        days = parse_days(args.days)
+    except ValueError as error:
+        parser.error(str(error))
+
+    start = time.perf_counter()
+    report = run_days(days, args.trader, not args.no_trade_matching, args.workers, profile=args.profile, queue_position=args.queue)
+    print(report.summary())
+    print(f"took {time.perf_counter() - start:.2f}s")
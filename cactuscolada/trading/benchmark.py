@@ -0,0 +1,277 @@
+import argparse
+import collections
+import json
+import os
+import pickle
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from datamodel import *
+import backtester
+import traitor
+
+
+def load_states(round_num: int, day: int) -> List[TradingState]:
+    data = backtester.load_day(round_num, day)
+    observations = Observation({}, {})
+    return [TradingState("", timestamp, {}, data.order_depths(timestamp), {}, {}, {}, observations) for timestamp in data.timestamps]
+
+
+def legacy_sorts(state: TradingState, traders: Dict[Symbol, traitor.Traitor]) -> None:
+    # what each trader used to do on its own before the shared books existed
+    def sort_book(symbol):
+        order_depth = state.order_depths[symbol]
+        sell_orders = collections.OrderedDict(sorted(order_depth.sell_orders.items()))
+        buy_orders = collections.OrderedDict(sorted(order_depth.buy_orders.items(), reverse=True))
+        return next(reversed(buy_orders)), next(reversed(sell_orders))
+
+    for symbol, trader in traders.items():
+        sort_book(symbol)
+        if isinstance(trader, traitor.GiftItem):
+            for other in state.order_depths.keys():
+                sort_book(other)
+
+
+def shared_books(state: TradingState, traders: Dict[Symbol, traitor.Traitor], cache: Dict[Symbol, traitor.OrderBook]) -> None:
+    books = traitor.build_books(state, cache)
+    for symbol, trader in traders.items():
+        book = books[symbol]
+        book.worst_bid, book.worst_ask
+        if isinstance(trader, traitor.GiftItem):
+            for other in books.keys():
+                trader.get_mid_price(books, other)
+
+
+def time_per_tick(fn, states: List[TradingState], *args) -> float:
+    start = time.perf_counter()
+    for state in states:
+        fn(state, *args)
+    return (time.perf_counter() - start) / len(states) * 1e6
+
+
+def bench_books(args) -> None:
+    trader = traitor.Trader()
+    for round_num, day in [(1, -1), (3, 0)]:
+        states = load_states(round_num, day)[:args.ticks]
+        symbols = states[0].order_depths.keys()
+        traders = {symbol: trader.resource_traders[symbol] for symbol in symbols if symbol in trader.resource_traders}
+
+        legacy = time_per_tick(legacy_sorts, states, traders)
+        shared = time_per_tick(shared_books, states, traders, {})
+        print(f"round {round_num} day {day} ({', '.join(traders)})")
+        print(f"  per-trader sorting: {legacy:8.1f} us/tick")
+        print(f"  shared books:       {shared:8.1f} us/tick ({legacy / shared:.1f}x)")
+
+
+def bench_checkpoint(args) -> None:
+    import jsonpickle
+
+    for round_num, day in [(1, -1), (3, 0)]:
+        states = load_states(round_num, day)[:args.ticks]
+        trader = traitor.Trader()
+        trader.resource_traders = {symbol: t for symbol, t in trader.resource_traders.items() if symbol in states[0].order_depths}
+        checkpointer = traitor.Checkpointer(trader.resource_traders)
+
+        pickle_time = checkpoint_time = 0.0
+        pickle_size = checkpoint_size = 0
+        for state in states:
+            books = traitor.build_books(state)
+            for t in trader.resource_traders.values():
+                t.process(state, books)
+
+            start = time.perf_counter()
+            pickled = jsonpickle.encode(trader.resource_traders)
+            pickle_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            encoded = checkpointer.encode(trader.resource_traders)
+            checkpoint_time += time.perf_counter() - start
+
+            pickle_size += len(pickled)
+            checkpoint_size += len(encoded)
+
+        restored = traitor.Trader()
+        restored.checkpointer.decode(encoded, restored.resource_traders)
+        for symbol, t in trader.resource_traders.items():
+            assert restored.resource_traders[symbol].checkpoint() == t.checkpoint(), symbol
+
+        n = len(states)
+        print(f"round {round_num} day {day}")
+        print(f"  jsonpickle:   {pickle_time / n * 1e6:8.1f} us/tick {pickle_size / n:8.0f} bytes/tick")
+        print(f"  checkpointer: {checkpoint_time / n * 1e6:8.1f} us/tick {checkpoint_size / n:8.0f} bytes/tick")
+
+
+def bench_logger(args) -> None:
+    import contextlib
+    import io
+
+    states = load_states(3, 0)[:args.ticks]
+    trader = traitor.Trader()
+    trader.resource_traders = {symbol: t for symbol, t in trader.resource_traders.items() if symbol in states[0].order_depths}
+    outputs = []
+    for state in states:
+        with contextlib.redirect_stdout(io.StringIO()):
+            outputs.append(trader.run(state))
+
+    for name, logger in [
+        ("json", traitor.Logger()),
+    ]:
+        buffer = io.StringIO()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(buffer):
+            for state, (orders, conversions, trader_data) in zip(states, outputs):
+                logger.print("Symbol: ", "GIFT_BASKET", "Expected Price: ", 70000.5)
+                logger.flush(state, orders, conversions, trader_data)
+        elapsed = time.perf_counter() - start
+        lines = buffer.getvalue().splitlines()
+        assert json.loads(lines[0])[0][0] == states[0].timestamp
+        print(f"{name:<22} {elapsed / len(states) * 1e6:8.1f} us/tick {len(buffer.getvalue()) / len(states):8.0f} bytes/tick")
+
+
+class DictOrder:
+    def __init__(self, symbol: Symbol, price: int, quantity: int) -> None:
+        self.symbol = symbol
+        self.price = price
+        self.quantity = quantity
+
+
+class DictOrderDepth:
+    def __init__(self):
+        self.buy_orders: Dict[int, int] = {}
+        self.sell_orders: Dict[int, int] = {}
+
+
+class DictTrade:
+    def __init__(self, symbol: Symbol, price: int, quantity: int, buyer: UserId=None, seller: UserId=None, timestamp: int=0) -> None:
+        self.symbol = symbol
+        self.price = price
+        self.quantity = quantity
+        self.buyer = buyer
+        self.seller = seller
+        self.timestamp = timestamp
+
+
+class DictTradingState:
+    def __init__(self, traderData, timestamp, listings, order_depths, own_trades, market_trades, position, observations):
+        self.traderData = traderData
+        self.timestamp = timestamp
+        self.listings = listings
+        self.order_depths = order_depths
+        self.own_trades = own_trades
+        self.market_trades = market_trades
+        self.position = position
+        self.observations = observations
+
+
+def bench_datamodel(args) -> None:
+    import tracemalloc
+
+    # the pre-__slots__ classes, swapped into the modules that construct them
+    legacy = {
+        traitor: {"Order": DictOrder},
+        backtester: {"Trade": DictTrade, "OrderDepth": DictOrderDepth, "TradingState": DictTradingState},
+    }
+
+    def replay():
+        tracemalloc.start()
+        day = backtester.load_day(args.round, args.day)
+        loaded, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        result = backtester.run_backtest(traitor.Trader(), day)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return result, elapsed, loaded, peak
+
+    slotted, slotted_time, slotted_loaded, slotted_peak = replay()
+
+    originals = {module: {name: getattr(module, name) for name in names} for module, names in legacy.items()}
+    for module, names in legacy.items():
+        for name, cls in names.items():
+            setattr(module, name, cls)
+    try:
+        dicts, dict_time, dict_loaded, dict_peak = replay()
+    finally:
+        for module, names in originals.items():
+            for name, cls in names.items():
+                setattr(module, name, cls)
+
+    assert slotted.pnl == dicts.pnl
+    sizes = [
+        ("Order", sys.getsizeof(Order("STARFRUIT", 5000, 1)), DictOrder("STARFRUIT", 5000, 1)),
+        ("Trade", sys.getsizeof(Trade("STARFRUIT", 5000, 1, "", "", 0)), DictTrade("STARFRUIT", 5000, 1, "", "", 0)),
+        ("OrderDepth", sys.getsizeof(OrderDepth()), DictOrderDepth()),
+    ]
+    print(f"round {args.round} day {args.day} replay (tracemalloc on)")
+    print(f"  dict-backed: {dict_time:6.2f}s  loaded day {dict_loaded / 1e6:6.1f} MB  replay peak {dict_peak / 1e6:6.1f} MB")
+    print(f"  slotted:     {slotted_time:6.2f}s  loaded day {slotted_loaded / 1e6:6.1f} MB  replay peak {slotted_peak / 1e6:6.1f} MB")
+    for name, slotted_size, instance in sizes:
+        print(f"  {name:<11} {sys.getsizeof(instance) + sys.getsizeof(instance.__dict__):4} -> {slotted_size:4} bytes")
+
+
+STARTUP_SCRIPT = """
+import json, os, pickle, sys, time
+start = time.perf_counter()
+import traitor
+imported = time.perf_counter()
+with open(sys.argv[1], "rb") as file:
+    state = pickle.load(file)
+sys.stdout = open(os.devnull, "w")
+run_start = time.perf_counter()
+trader = traitor.Trader()
+trader.resource_traders = {symbol: t for symbol, t in trader.resource_traders.items() if symbol in state.order_depths}
+trader.run(state)
+ran = time.perf_counter()
+sys.stdout = sys.__stdout__
+print(json.dumps([imported - start, ran - run_start, sorted(name for name in ("numpy", "pandas", "jsonpickle") if name in sys.modules)]))
+"""
+
+
+def bench_startup(args) -> None:
+    # every run is a fresh interpreter, so this is the cold start the exchange pays per invocation
+    state = load_states(args.round, args.day)[0]
+    with tempfile.NamedTemporaryFile(suffix=".pkl", delete=False) as file:
+        pickle.dump(state, file)
+    directory = os.path.dirname(os.path.abspath(__file__))
+
+    imports, first_runs, walls = [], [], []
+    try:
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            output = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT, file.name], cwd=directory, capture_output=True, text=True, check=True).stdout
+            walls.append(time.perf_counter() - start)
+            imported, first_run, heavy = json.loads(output.splitlines()[-1])
+            imports.append(imported)
+            first_runs.append(first_run)
+    finally:
+        os.remove(file.name)
+
+    print(f"round {args.round} day {args.day}, median of {args.runs} fresh interpreters")
+    print(f"  import traitor:     {statistics.median(imports) * 1000:8.1f} ms")
+    print(f"  first Trader().run: {statistics.median(first_runs) * 1000:8.1f} ms")
+    print(f"  whole process:      {statistics.median(walls) * 1000:8.1f} ms")
+    print(f"  heavy modules loaded: {', '.join(heavy) or 'none'}")
+
+
+BENCHMARKS = {
+    "books": bench_books,
+    "checkpoint": bench_checkpoint,
+    "logger": bench_logger,
+    "datamodel": bench_datamodel,
+    "startup": bench_startup,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("benchmark", choices=BENCHMARKS.keys())
+    parser.add_argument("--ticks", type=int, default=10000)
+    parser.add_argument("--round", type=int, default=3)
+    parser.add_argument("--day", type=int, default=0)
+    parser.add_argument("--runs", type=int, default=10, help="fresh interpreters for the startup benchmark")
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args)
@@ -0,0 +1,228 @@
+import argparse
+import itertools
+import os
+import time
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+import backtester
+import traitor
+
+DAYS = [-1, 0, 1]
+LIMIT = 100
+CHUNK = 1024 # settings simulated together, bounds the (ticks, settings) arrays. the tick loop costs about the same per call at any width
+
+# the round 2 csvs only carry the conversion mid (ORCHIDS), the fees and the tariffs. the conversion
+# bid/ask spread and the local book are not in them, so they are parameters: the conversion bid/ask sit
+# half_spread either side of the mid, the local book is one level local_half_spread either side with
+# local_volume on it, and taker_volume of bot flow per tick hits resting orders priced inside it
+CONVERSION_HALF_SPREAD = 0.5
+LOCAL_HALF_SPREAD = 3
+LOCAL_VOLUME = 10
+TAKER_VOLUME = 5
+STORED_FEE = 0.1 # per unit long per timestamp, OrchidTrader.stored_fee
+
+
+class ConversionTape:
+    # one round 2 day, everything OrchidTrader derives from the observations before trading
+    def __init__(self, day: int, mid: np.ndarray, transport: np.ndarray, export_tariff: np.ndarray, import_tariff: np.ndarray,
+                 half_spread: float = CONVERSION_HALF_SPREAD, local_half_spread: float = LOCAL_HALF_SPREAD) -> None:
+        self.day = day
+        self.mid = mid
+        bid = mid - half_spread
+        ask = mid + half_spread
+        self.conversion_bid = bid - export_tariff - transport # adjusted_conversion_bid_price
+        self.conversion_ask = ask + import_tariff + transport # adjusted_conversion_ask_price
+
+        # predict_next_price: the orchid model over the previous four conversion mids, the mid itself until there are four
+        model = traitor.MODELS["orchid"]
+        future = mid.copy()
+        windows = np.lib.stride_tricks.sliding_window_view(mid[:-1], len(model["coefficients"]))
+        future[len(model["coefficients"]):] = windows @ np.asarray(model["coefficients"]) + model["intercept"]
+        self.future_bid = np.floor(future - export_tariff - transport) # future_adjusted_conversion_bid_price
+        self.future_ask = np.ceil(future + import_tariff + transport)
+
+        self.local_bid = np.floor(mid - local_half_spread)
+        self.local_ask = np.ceil(mid + local_half_spread)
+
+    def __len__(self) -> int:
+        return len(self.mid)
+
+
+def load_tape(day: int, half_spread: float = CONVERSION_HALF_SPREAD, local_half_spread: float = LOCAL_HALF_SPREAD, data_dir: str = backtester.DATA_DIR) -> ConversionTape:
+    prices = pd.read_csv(os.path.join(data_dir, "data_round2", f"prices_round_2_day_{day}.csv"), sep=";").sort_values("timestamp", kind="stable")
+    column = lambda name: prices[name].to_numpy(np.float64)
+    return ConversionTape(day, column("ORCHIDS"), column("TRANSPORT_FEES"), column("EXPORT_TARIFF"), column("IMPORT_TARIFF"), half_spread, local_half_spread)
+
+
+def settings_grid(buy_edges: List[float], sell_edges: List[float], offsets: List[int]) -> pd.DataFrame:
+    # trade only has the take thresholds, trade2 also quotes offset past the future conversion prices
+    rows = [("trade", buy_edge, sell_edge, 0) for buy_edge, sell_edge in itertools.product(buy_edges, sell_edges)]
+    rows += [("trade2", buy_edge, sell_edge, offset) for buy_edge, sell_edge, offset in itertools.product(buy_edges, sell_edges, offsets)]
+    return pd.DataFrame(rows, columns=["strategy", "buy_edge", "sell_edge", "offset"])
+
+
+def limit_binds(limit: int, local_volume: int, taker_volume: int) -> bool:
+    # the start position is converted away every tick and one tick can only fill local_volume + taker_volume
+    # a side, so below this the limit never binds and every tick can be filled at once
+    return 2 * (local_volume + taker_volume) > limit
+
+
+def simulate(tape: ConversionTape, settings: pd.DataFrame, limit: int = LIMIT, local_volume: int = LOCAL_VOLUME, taker_volume: int = TAKER_VOLUME,
+             stored_fee: float = STORED_FEE) -> pd.DataFrame:
+    # every tick, in OrchidTrader's order: buy local asks under the conversion bid less stored_fee and buy_edge, sell
+    # local bids over the conversion ask plus sell_edge, trade2 then quotes the rest of the limit at
+    # future_ask + offset / future_bid - offset, and the start of tick position is converted away.
+    # OrderManager clips every side against the start position, orders fill in the order they were
+    # sent, the conversion is priced at this tick's observation, and whatever is long at the end of a
+    # tick pays stored_fee until the next one. the last tick's position is marked at the last mid
+    if not limit_binds(limit, local_volume, taker_volume):
+        return simulate_unconstrained(tape, settings, limit, local_volume, taker_volume, stored_fee)
+    chunks = []
+    for start in range(0, len(settings), CHUNK):
+        chunks.append(simulate_chunk(tape, settings.iloc[start:start + CHUNK], limit, local_volume, taker_volume, stored_fee))
+    return pd.concat(chunks, ignore_index=True)
+
+
+def side_fills(takes: np.ndarray, crosses: np.ndarray, improves: np.ndarray, room, local_volume: int, taker_volume: int):
+    # one side of a tick (or of every tick at once): the take at the book, trade2's quote crossing what
+    # is left of the book level, then bot flow hitting the quote if it improves on the book
+    taken = np.minimum(room, local_volume) * takes
+    room = room - taken
+    crossed = np.minimum(room, local_volume - taken) * crosses
+    room = room - crossed
+    rested = np.minimum(room, taker_volume) * improves
+    return taken + crossed, rested
+
+
+def side_arrays(tape: ConversionTape, quoting: np.ndarray, edge: np.ndarray, offset: np.ndarray, buy: bool, stored_fee: float = 0):
+    # everything about one side that doesn't depend on the position, as (ticks, settings):
+    # book price, quote price, and whether the take, the quote crossing and the quote resting apply.
+    # a unit bought is held until the next tick's conversion, so the buy take also clears stored_fee
+    if buy:
+        book, other = tape.local_ask[:, None], tape.local_bid[:, None]
+        takes = book < tape.conversion_bid[:, None] - stored_fee - edge
+        quote = tape.future_ask[:, None] + offset
+        return book, quote, takes, quoting & (quote >= book), quoting & (quote > other)
+    book, other = tape.local_bid[:, None], tape.local_ask[:, None]
+    takes = book > tape.conversion_ask[:, None] + edge
+    quote = tape.future_bid[:, None] - offset
+    return book, quote, takes, quoting & (quote <= book), quoting & (quote < other)
+
+
+def simulate_unconstrained(tape: ConversionTape, settings: pd.DataFrame, limit: int, local_volume: int, taker_volume: int, stored_fee: float) -> pd.DataFrame:
+    # a side's fills only depend on the strategy, that side's edge and the offset, so every distinct
+    # side is filled once and the settings combine them. converting a position p costs p * ask + max(p, 0)
+    # * (bid - ask), everything but the max part adds up per side
+    quoting = (settings["strategy"] == "trade2").to_numpy()
+    offset = np.where(quoting, settings["offset"].to_numpy(np.float64), 0.0)
+
+    def side(edge_column: str, buy: bool):
+        keys, index = np.unique(np.column_stack([quoting, settings[edge_column].to_numpy(np.float64), offset]), axis=0, return_inverse=True)
+        book, quote, takes, crosses, improves = side_arrays(tape, keys[:, 0] > 0, keys[:, 1], keys[:, 2], buy, stored_fee if buy else 0)
+        at_book, rested = side_fills(takes, crosses, improves, limit, local_volume, taker_volume)
+        return at_book + rested, (at_book * book + rested * quote).sum(axis=0), index.ravel()
+
+    bought, buy_cost, buy_index = side("buy_edge", True)
+    sold, sell_revenue, sell_index = side("sell_edge", False)
+    next_ask = tape.conversion_ask[1:]
+    next_spread = tape.conversion_bid[1:] - next_ask
+    bought_held, sold_held = bought[:-1].sum(axis=0), sold[:-1].sum(axis=0)
+    linear = (next_ask @ bought[:-1])[buy_index] - (next_ask @ sold[:-1])[sell_index]
+
+    long_value = np.empty(len(settings))
+    long_held = np.empty(len(settings))
+    long_last = np.empty(len(settings))
+    position = np.empty(len(settings))
+    for start in range(0, len(settings), CHUNK):
+        rows = slice(start, start + CHUNK)
+        positions = bought[:, buy_index[rows]] - sold[:, sell_index[rows]]
+        position[rows] = positions[-1]
+        long = np.maximum(positions, 0, out=positions)
+        long_value[rows] = next_spread @ long[:-1]
+        long_last[rows] = long[-1]
+        long_held[rows] = long[:-1].sum(axis=0)
+
+    cash = sell_revenue[sell_index] - buy_cost[buy_index] + linear + long_value
+    storage = stored_fee * (long_held + long_last)
+    return pd.DataFrame({
+        "pnl": cash - storage + position * tape.mid[-1],
+        "storage": storage,
+        "converted": 2 * long_held - (bought_held[buy_index] - sold_held[sell_index]),
+        "volume": bought.sum(axis=0)[buy_index] + sold.sum(axis=0)[sell_index],
+    })
+
+
+def simulate_chunk(tape: ConversionTape, settings: pd.DataFrame, limit: int, local_volume: int, taker_volume: int, stored_fee: float) -> pd.DataFrame:
+    # the limit can bind, so the position is carried tick by tick over every setting at once. a tick's
+    # fills depend on the position it starts with, so this can't be filled all at once like
+    # simulate_unconstrained: it runs a python loop over the ticks and manages several hundred settings/s per day
+    quoting = (settings["strategy"] == "trade2").to_numpy()
+    offset = settings["offset"].to_numpy(np.float64)
+    ask_book, bid_quote, takes_ask, bid_crosses, bid_improves = side_arrays(tape, quoting, settings["buy_edge"].to_numpy(np.float64), offset, True, stored_fee)
+    bid_book, ask_quote, takes_bid, ask_crosses, ask_improves = side_arrays(tape, quoting, settings["sell_edge"].to_numpy(np.float64), offset, False)
+
+    size = len(settings)
+    position = np.zeros(size)
+    cash = np.zeros(size)
+    storage = np.zeros(size)
+    converted = np.zeros(size)
+    volume = np.zeros(size)
+    for tick in range(len(tape)):
+        start = position
+        # createConversion(-position) at this tick's adjusted conversion prices
+        cash += np.where(start > 0, start * tape.conversion_bid[tick], start * tape.conversion_ask[tick])
+        converted += np.abs(start)
+
+        at_book, rested = side_fills(takes_ask[tick], bid_crosses[tick], bid_improves[tick], limit - start, local_volume, taker_volume)
+        cash -= at_book * ask_book[tick] + rested * bid_quote[tick]
+        bought = at_book + rested
+        at_book, rested = side_fills(takes_bid[tick], ask_crosses[tick], ask_improves[tick], limit + start, local_volume, taker_volume)
+        cash += at_book * bid_book[tick] + rested * ask_quote[tick]
+        sold = at_book + rested
+
+        position = bought - sold
+        volume += bought + sold
+        storage += stored_fee * np.maximum(position, 0)
+
+    return pd.DataFrame({
+        "pnl": cash - storage + position * tape.mid[-1],
+        "storage": storage,
+        "converted": converted,
+        "volume": volume,
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, nargs="+", default=DAYS)
+    parser.add_argument("--buy-edges", type=float, nargs="+", default=[-2, -1, 0, 1, 2, 3, 4])
+    parser.add_argument("--sell-edges", type=float, nargs="+", default=[-2, -1, 0, 1, 2, 3, 4])
+    parser.add_argument("--offsets", type=int, nargs="+", default=list(range(-3, 7)), help="trade2's quote offset, the live trader uses 3")
+    parser.add_argument("--half-spread", type=float, default=CONVERSION_HALF_SPREAD, help="conversion bid/ask distance from the mid")
+    parser.add_argument("--local-half-spread", type=float, default=LOCAL_HALF_SPREAD)
+    parser.add_argument("--local-volume", type=int, default=LOCAL_VOLUME)
+    parser.add_argument("--taker-volume", type=int, default=TAKER_VOLUME)
+    parser.add_argument("--stored-fee", type=float, default=STORED_FEE)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    settings = settings_grid(args.buy_edges, args.sell_edges, args.offsets)
+    start = time.perf_counter()
+    results = []
+    for day in args.days:
+        tape = load_tape(day, args.half_spread, args.local_half_spread)
+        results.append(simulate(tape, settings, LIMIT, args.local_volume, args.taker_volume, args.stored_fee))
+    seconds = time.perf_counter() - start
+
+    ranked = settings.join(sum(results)).sort_values("pnl", ascending=False)
+    print(f"{len(settings)} settings over {len(args.days)} days in {seconds:.2f}s ({len(settings) * len(args.days) / seconds:,.0f} settings/s per day)")
+    if limit_binds(LIMIT, args.local_volume, args.taker_volume):
+        print(f"the limit of {LIMIT} can bind with {args.local_volume} local and {args.taker_volume} taker volume a side, so every tick "
+              f"was simulated in turn. keep 2 * (local + taker volume) <= {LIMIT} for the fast path")
+    print(ranked.head(args.top).to_string(index=False, float_format="{:.1f}".format))
+    live = ranked[(ranked["buy_edge"] == 0) & (ranked["sell_edge"] == 0) & (ranked["offset"].isin([0, 3]))]
+    print("live settings:")
+    print(live.to_string(index=False, float_format="{:.1f}".format))
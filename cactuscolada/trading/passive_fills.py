@@ -0,0 +1,228 @@
+import argparse
+import itertools
+import os
+import time
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+import backtester
+
+LEVELS = 3
+CHUNK = 256 # variants simulated together, bounds the (ticks, variants) arrays to a few MB each
+
+
+class QuoteTape:
+    # one product over one day as arrays, one row per book timestamp. the market trades are padded
+    # into (ticks, most trades in a tick) with NaN prices, and only trades on a book timestamp are
+    # kept since those are the only ones the Exchange matches against
+    def __init__(self, round_num: int, day: int, product: str, timestamps: np.ndarray, bid_prices: np.ndarray, bid_volumes: np.ndarray,
+                 ask_prices: np.ndarray, ask_volumes: np.ndarray, mid_prices: np.ndarray, trade_prices: np.ndarray, trade_volumes: np.ndarray) -> None:
+        self.round_num = round_num
+        self.day = day
+        self.product = product
+        self.timestamps = timestamps
+        self.bid_prices = bid_prices
+        self.bid_volumes = bid_volumes
+        self.ask_prices = ask_prices
+        self.ask_volumes = ask_volumes
+        self.mid_prices = mid_prices
+        self.trade_prices = trade_prices
+        self.trade_volumes = trade_volumes
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def worst_bid(self) -> np.ndarray:
+        # the outermost levels, what the traders' best_buy_price / best_ask_price hold
+        return np.nanmin(self.bid_prices, axis=1)
+
+    @property
+    def worst_ask(self) -> np.ndarray:
+        return np.nanmax(self.ask_prices, axis=1)
+
+
+def load_tape(round_num: int, day: int, product: str, data_dir: str = backtester.DATA_DIR) -> QuoteTape:
+    folder = os.path.join(data_dir, f"data_round{round_num}")
+    prices = pd.read_csv(os.path.join(folder, f"prices_round_{round_num}_day_{day}.csv"), sep=";")
+    prices = prices[prices["product"] == product].sort_values("timestamp", kind="stable")
+    timestamps = prices["timestamp"].to_numpy(np.int64)
+
+    def levels(name: str) -> Tuple[np.ndarray, np.ndarray]:
+        book_prices = prices[[f"{name}_price_{level}" for level in range(1, LEVELS + 1)]].to_numpy(np.float64)
+        volumes = prices[[f"{name}_volume_{level}" for level in range(1, LEVELS + 1)]].to_numpy(np.float64)
+        return book_prices, np.where(np.isnan(book_prices), 0.0, np.abs(volumes))
+
+    bid_prices, bid_volumes = levels("bid")
+    ask_prices, ask_volumes = levels("ask")
+
+    trade_prices = np.full((len(timestamps), 1), np.nan)
+    trade_volumes = np.zeros((len(timestamps), 1))
+    trades_path = os.path.join(folder, f"trades_round_{round_num}_day_{day}_nn.csv")
+    if os.path.exists(trades_path):
+        tape = pd.read_csv(trades_path, sep=";")
+        tape = tape[tape["symbol"] == product]
+        rows = np.searchsorted(timestamps, tape["timestamp"].to_numpy())
+        on_book = (rows < len(timestamps)) & (timestamps[np.minimum(rows, len(timestamps) - 1)] == tape["timestamp"].to_numpy())
+        tape, rows = tape[on_book], rows[on_book]
+        if len(tape):
+            slot = tape.groupby("timestamp").cumcount().to_numpy()
+            trade_prices = np.full((len(timestamps), slot.max() + 1), np.nan)
+            trade_volumes = np.zeros((len(timestamps), slot.max() + 1))
+            trade_prices[rows, slot] = tape["price"].round().to_numpy() # the backtester rounds tape prices too
+            trade_volumes[rows, slot] = tape["quantity"].to_numpy()
+
+    return QuoteTape(round_num, day, product, timestamps, bid_prices, bid_volumes, ask_prices, ask_volumes,
+                     prices["mid_price"].to_numpy(np.float64), trade_prices, trade_volumes)
+
+
+def undercut_quotes(tape: QuoteTape, fair, bid_offsets: List[int], ask_offsets: List[int], bid_edges: List[int], ask_edges: List[int]) -> Tuple[np.ndarray, np.ndarray, pd.DataFrame]:
+    # the in-between quotes of AmethystTrader: bid = min(worst bid + offset, fair - edge) and
+    # ask = max(worst ask - offset, fair + edge), one variant per combination. fair is a number or one per tick
+    params = pd.DataFrame(list(itertools.product(bid_offsets, ask_offsets, bid_edges, ask_edges)), columns=["bid_offset", "ask_offset", "bid_edge", "ask_edge"])
+    fair = np.broadcast_to(np.asarray(fair, dtype=np.float64), (len(tape),))
+    column = lambda name: params[name].to_numpy(np.float64)[:, None]
+    bids = np.minimum(tape.worst_bid + column("bid_offset"), np.floor(fair - column("bid_edge")))
+    asks = np.maximum(tape.worst_ask - column("ask_offset"), np.ceil(fair + column("ask_edge")))
+    return bids, asks, params
+
+
+def available(quotes: np.ndarray, tape: QuoteTape, buy: bool, queue_position: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # for (ticks, variants) quotes: the volume we'd take off each opposite book level, then what market
+    # trades at or through the quote leave for us, and the displayed volume queued ahead of us
+    book_prices, book_volumes = (tape.ask_prices, tape.ask_volumes) if buy else (tape.bid_prices, tape.bid_volumes)
+    own_prices, own_volumes = (tape.bid_prices, tape.bid_volumes) if buy else (tape.ask_prices, tape.ask_volumes)
+    sign = 1 if buy else -1
+
+    takes = np.zeros((LEVELS,) + quotes.shape)
+    for level in range(LEVELS):
+        crosses = sign * (quotes - book_prices[:, level, None]) >= 0 # NaN levels never cross
+        takes[level] = np.where(crosses, book_volumes[:, level, None], 0.0)
+
+    through = np.zeros(quotes.shape)
+    at = np.zeros(quotes.shape)
+    for slot in range(tape.trade_prices.shape[1]):
+        price = tape.trade_prices[:, slot, None]
+        volume = tape.trade_volumes[:, slot, None]
+        through += np.where(sign * (quotes - price) > 0, volume, 0.0)
+        at += np.where(quotes == price, volume, 0.0)
+
+    ahead = np.zeros(quotes.shape)
+    if queue_position:
+        for level in range(LEVELS):
+            ahead += np.where(own_prices[:, level, None] == quotes, own_volumes[:, level, None], 0.0)
+    return takes, through + np.maximum(at - ahead, 0.0), ahead
+
+
+def simulate(tape: QuoteTape, bids: np.ndarray, asks: np.ndarray, limit: int, size: int = None, queue_position: bool = True) -> pd.DataFrame:
+    # every tick each variant posts one bid and one ask for everything the limit allows (capped at size)
+    # and the Exchange's rules decide the fills: the book first, then market trades at or through the
+    # quote at the quote's price. the fills themselves are sequential through the position, everything
+    # else is computed per day over (ticks, variants) arrays. a variant whose bid ever reaches its own
+    # ask has both orders competing for the same market trades, those are marked crossed and left NaN
+    bids = np.atleast_2d(np.asarray(bids, dtype=np.float64))
+    asks = np.atleast_2d(np.asarray(asks, dtype=np.float64))
+    size = limit * 2 if size is None else size
+    chunks = []
+    for start in range(0, len(bids), CHUNK):
+        chunks.append(simulate_chunk(tape, bids[start:start + CHUNK].T, asks[start:start + CHUNK].T, limit, size, queue_position))
+    result = pd.concat(chunks, ignore_index=True)
+    result["crossed"] = (bids >= asks).any(axis=1)
+    result.loc[result["crossed"], result.columns[:-1]] = np.nan
+    return result
+
+
+def simulate_chunk(tape: QuoteTape, bids: np.ndarray, asks: np.ndarray, limit: int, size: int, queue_position: bool) -> pd.DataFrame:
+    buy_takes, buy_passive, bid_ahead = available(bids, tape, True, queue_position)
+    sell_takes, sell_passive, ask_ahead = available(asks, tape, False, queue_position)
+    # passive quotes rarely cross, the book levels are only walked on ticks where some variant does
+    buy_crosses = buy_takes.any(axis=(0, 2)).tolist()
+    sell_crosses = sell_takes.any(axis=(0, 2)).tolist()
+    ask_prices = np.nan_to_num(tape.ask_prices)
+    bid_prices = np.nan_to_num(tape.bid_prices)
+
+    # an empty book side leaves that quote NaN, it never matches and is not posted
+    bid_open = ~np.isnan(bids)
+    ask_open = ~np.isnan(asks)
+    bids = np.nan_to_num(bids)
+    asks = np.nan_to_num(asks)
+
+    variants = bids.shape[1]
+    position = np.zeros(variants)
+    cash = np.zeros(variants)
+    volume = np.zeros(variants)
+    bid_fills = np.zeros(variants)
+    ask_fills = np.zeros(variants)
+    bid_quoted = np.zeros(variants)
+    ask_quoted = np.zeros(variants)
+    for tick in range(len(tape)):
+        # both sides are sized off the position at the start of the tick, like the Exchange's limit check
+        buy_left = np.minimum(limit - position, size) * bid_open[tick]
+        sell_left = np.minimum(limit + position, size) * ask_open[tick]
+        bid_quoted += buy_left > 0
+        ask_quoted += sell_left > 0
+
+        if buy_crosses[tick]:
+            for level in range(LEVELS):
+                taken = np.minimum(buy_left, buy_takes[level, tick])
+                cash -= taken * ask_prices[tick, level]
+                buy_left -= taken
+                position += taken
+                volume += taken
+        if sell_crosses[tick]:
+            for level in range(LEVELS):
+                taken = np.minimum(sell_left, sell_takes[level, tick])
+                cash += taken * bid_prices[tick, level]
+                sell_left -= taken
+                position -= taken
+                volume += taken
+
+        bought = np.minimum(buy_left, buy_passive[tick])
+        sold = np.minimum(sell_left, sell_passive[tick])
+        cash += sold * asks[tick] - bought * bids[tick]
+        position += bought - sold
+        volume += bought + sold
+        bid_fills += bought > 0
+        ask_fills += sold > 0
+
+    return pd.DataFrame({
+        "pnl": cash + position * tape.mid_prices[-1],
+        "position": position.astype(np.int64),
+        "volume": volume.astype(np.int64),
+        "bid_fill_probability": bid_fills / np.maximum(bid_quoted, 1),
+        "ask_fill_probability": ask_fills / np.maximum(ask_quoted, 1),
+        "bid_queue_ahead": bid_ahead.mean(axis=0),
+        "ask_queue_ahead": ask_ahead.mean(axis=0),
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("days", nargs="+", help="rounds or round:day pairs, e.g. 1 3:0")
+    parser.add_argument("--product", default="AMETHYSTS")
+    parser.add_argument("--fair", default="10000", help="a price, or 'mid' for each tick's mid price")
+    parser.add_argument("--offsets", type=int, nargs="+", default=[0, 1, 2, 3], help="undercut of the worst bid / ask")
+    parser.add_argument("--edges", type=int, nargs="+", default=[1, 2, 3, 4], help="minimum distance from fair")
+    parser.add_argument("--size", type=int, default=None, help="most to quote per side, defaults to anything the limit allows")
+    parser.add_argument("--no-queue", action="store_true", help="fill at our price ahead of the displayed volume")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    limit = backtester.LIMITS[args.product]
+    days = backtester.parse_days(args.days)
+    results = []
+    for round_num, day in days:
+        tape = load_tape(round_num, day, args.product)
+        fair = tape.mid_prices if args.fair == "mid" else float(args.fair)
+        bids, asks, params = undercut_quotes(tape, fair, args.offsets, args.offsets, args.edges, args.edges)
+        results.append(simulate(tape, bids, asks, limit, args.size, not args.no_queue))
+
+    # the variants are the same every day, pnl and volume add up and the rates average
+    stacked = pd.concat(results, keys=range(len(results))).groupby(level=1)
+    summary = stacked[["pnl", "volume"]].sum().join(stacked[["bid_fill_probability", "ask_fill_probability", "bid_queue_ahead", "ask_queue_ahead"]].mean())
+    ranked = params.join(summary).sort_values("pnl", ascending=False)
+    print(f"{len(params)} variants over {len(days)} days ({'no queue' if args.no_queue else 'queue'}), took {time.perf_counter() - start:.2f}s")
+    print(ranked.head(args.top).to_string(index=False, float_format="{:.3f}".format))
@@ -0,0 +1,172 @@
+import argparse
+import hashlib
+import importlib
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+import backtester
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backtests", "sweep_cache")
+# bump when the shape of a cached result or its key changes
+CACHE_VERSION = 2
+
+# {"StarfruitTrader": {"edge": [0, 1, 2]}, "AmethystTrader": {"acceptable_bid": [9999, 10000]}}
+Space = Dict[str, Dict[str, List[Any]]]
+Params = Dict[str, Dict[str, Any]]
+
+
+def candidates(space: Space) -> List[Params]:
+    keys = [(class_name, attribute) for class_name, attributes in space.items() for attribute in attributes]
+    values = [space[class_name][attribute] for class_name, attribute in keys]
+
+    params_list = []
+    for combination in itertools.product(*values):
+        params: Params = {}
+        for (class_name, attribute), value in zip(keys, combination):
+            params.setdefault(class_name, {})[attribute] = value
+        params_list.append(params)
+    return params_list
+
+
+def describe(params: Params) -> str:
+    return " ".join(f"{class_name}.{attribute}={json.dumps(value)}" for class_name, attributes in params.items() for attribute, value in attributes.items())
+
+
+def source_hash(trader_module: str) -> str:
+    # results are only reusable while the strategy and the simulation replaying it are the same
+    digest = hashlib.sha1()
+    for module in (trader_module, "backtester", "datamodel"):
+        with open(importlib.import_module(module).__file__, "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def cache_key(source: str, params: Params, round_num: int, day: int, match_trades: bool, queue_position: bool = False) -> str:
+    blob = json.dumps({"version": CACHE_VERSION, "source": source, "params": params, "round": round_num, "day": day,
+                       "match_trades": match_trades, "queue_position": queue_position}, sort_keys=True)
+    return hashlib.sha1(blob.encode()).hexdigest()
+
+
+def evaluate(round_num: int, day: int, trader_module: str, match_trades: bool, params: Params, queue_position: bool = False) -> Dict[str, Any]:
+    result = backtester.backtest_day(round_num, day, trader_module, match_trades, params, queue_position=queue_position)
+    return {"pnl": result.pnl, "fills": dict(result.fills), "rejected": dict(result.rejected)}
+
+
+class Candidate:
+    def __init__(self, params: Params) -> None:
+        self.params = params
+        self.days: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        self.pruned_after = None
+
+    def total_pnl(self) -> float:
+        return sum(sum(result["pnl"].values()) for result in self.days.values())
+
+
+class Sweep:
+    def __init__(self, space: Space, days: List[Tuple[int, int]], trader_module: str = "traitor", match_trades: bool = True,
+                 workers: int = None, keep_fraction: float = 0.5, min_days: int = 1, cache_dir: str = CACHE_DIR, queue_position: bool = False) -> None:
+        self.candidates = [Candidate(params) for params in candidates(space)]
+        self.days = days
+        self.trader_module = trader_module
+        self.match_trades = match_trades
+        self.queue_position = queue_position
+        self.workers = workers
+        self.keep_fraction = keep_fraction
+        self.min_days = min_days
+        self.cache_dir = cache_dir
+        self.source = source_hash(trader_module)
+        self.cache_hits = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def cached(self, key: str) -> Dict[str, Any]:
+        path = os.path.join(self.cache_dir, key + ".json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as file:
+            return json.load(file)
+
+    def store(self, key: str, result: Dict[str, Any]) -> None:
+        with open(os.path.join(self.cache_dir, key + ".json"), "w") as file:
+            json.dump(result, file)
+
+    def prune(self, alive: List[Candidate], days_done: int) -> List[Candidate]:
+        # after min_days, drop anything making less than keep_fraction of the leader so far
+        if days_done < self.min_days or len(alive) <= 1:
+            return alive
+        best = max(candidate.total_pnl() for candidate in alive)
+        if best <= 0:
+            return alive
+        survivors = []
+        for candidate in alive:
+            if candidate.total_pnl() >= best * self.keep_fraction:
+                survivors.append(candidate)
+            else:
+                candidate.pruned_after = days_done
+        return survivors
+
+    def run(self) -> List[Candidate]:
+        alive = list(self.candidates)
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            for days_done, (round_num, day) in enumerate(self.days, start=1):
+                pending = {}
+                for candidate in alive:
+                    key = cache_key(self.source, candidate.params, round_num, day, self.match_trades, self.queue_position)
+                    result = self.cached(key)
+                    if result is not None:
+                        self.cache_hits += 1
+                        candidate.days[(round_num, day)] = result
+                    else:
+                        future = executor.submit(evaluate, round_num, day, self.trader_module, self.match_trades, candidate.params, self.queue_position)
+                        pending[future] = (candidate, key)
+
+                for future, (candidate, key) in pending.items():
+                    result = future.result()
+                    self.store(key, result)
+                    candidate.days[(round_num, day)] = result
+
+                alive = self.prune(alive, days_done)
+
+        return sorted(self.candidates, key=lambda candidate: (candidate.pruned_after is None, candidate.pruned_after or 0, candidate.total_pnl()), reverse=True)
+
+
+def parse_param(spec: str) -> Tuple[str, str, List[Any]]:
+    # StarfruitTrader.edge=[0,1,2]
+    name, _, values = spec.partition("=")
+    class_name, _, attribute = name.partition(".")
+    return class_name, attribute, json.loads(values)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("days", nargs="+", help="rounds or round:day pairs, e.g. 1 3:0")
+    parser.add_argument("--space", help="json file with {class name: {attribute: [values]}}")
+    parser.add_argument("--param", action="append", default=[], help="e.g. 'StarfruitTrader.edge=[0,1,2]'")
+    parser.add_argument("--trader", default="traitor", help="module with the Trader class")
+    parser.add_argument("--no-trade-matching", action="store_true", help="only fill against the order book")
+    parser.add_argument("--queue", action="store_true", help="passive orders queue behind the displayed volume at their price")
+    parser.add_argument("--workers", type=int, default=None, help="processes to use, defaults to the cpu count")
+    parser.add_argument("--keep-fraction", type=float, default=0.5, help="drop candidates below this share of the leader's pnl")
+    parser.add_argument("--min-days", type=int, default=1, help="days to evaluate before pruning")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    space: Space = {}
+    if args.space:
+        with open(args.space) as file:
+            space = json.load(file)
+    for spec in args.param:
+        class_name, attribute, values = parse_param(spec)
+        space.setdefault(class_name, {})[attribute] = values
+
+    start = time.perf_counter()
+    sweep = Sweep(space, backtester.parse_days(args.days), args.trader, not args.no_trade_matching, args.workers, args.keep_fraction, args.min_days, queue_position=args.queue)
+    ranked = sweep.run()
+
+    print(f"{len(sweep.candidates)} candidates over {len(sweep.days)} days, {sweep.cache_hits} cached results, took {time.perf_counter() - start:.2f}s")
+    for candidate in ranked[:args.top]:
+        status = "" if candidate.pruned_after is None else f"  (pruned after {candidate.pruned_after} days)"
+        print(f"{candidate.total_pnl():>12,.1f}  {describe(candidate.params)}{status}")
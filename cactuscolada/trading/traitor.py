@@ -1,11 +1,21 @@
 from datamodel import *
 import json
 from typing import Any
-import numpy as np
+from array import array
 import math
-import collections
+import time
 from typing import Dict, Tuple, List
-import jsonpickle
+
+# models: generated by analyzing/model_registry.py deploy, edit the artifacts in analyzing/models instead
+MODELS: Dict[str, Dict[str, Any]] = {
+    "basket": {"kind":"linear","features":["chocolate_deviation","strawberry_deviation","rose_deviation"],"coefficients":[0.45610365,0.32678862,0.18270502],"intercept":-0.00043099352457925955},
+    "chocolate": {"kind":"linear","features":["basket_deviation","strawberry_deviation","rose_deviation"],"coefficients":[1.90804964,-0.57008893,-0.38161253],"intercept":-0.0002940641867402241},
+    "orchid": {"kind":"linear","features":["mid_0","mid_1","mid_2","mid_3"],"coefficients":[-0.00288106,0.01107265,-0.01295004,1.00473299],"intercept":0.02269031575860936},
+    "rose": {"kind":"linear","features":["basket_deviation","chocolate_deviation","strawberry_deviation"],"coefficients":[3.98579962,-1.99003957,-1.29602731],"intercept":-0.0019972956749151373},
+    "starfruit": {"kind":"linear","features":["mid_0","mid_1","mid_2","mid_3"],"coefficients":[0.18925881,0.20729211,0.26096944,0.3419978],"intercept":2.088673614521994},
+    "strawberry": {"kind":"linear","features":["basket_deviation","chocolate_deviation","rose_deviation"],"coefficients":[2.43743794,-1.01644375,-1.29602731],"intercept":0.0018273749461782483},
+}
+# end models
 
 class Trader:
     def __init__(self):
@@ -18,58 +28,600 @@ class Trader:
             "STRAWBERRIES": StrawberryTrader("STRAWBERRIES"),
             "ROSES": RoseTrader("ROSES"),
         }
+        self.basket_signal = BasketSignal() # shared by the gift basket legs, computed once per tick
+        for trader in self.resource_traders.values():
+            if isinstance(trader, GiftItem):
+                self.basket_signal.attach(trader)
         self.orderManager: OrderManager = OrderManager()
+        # net units of a component, direct or inside baskets, are capped at what either a full basket position or
+        # the leg alone could hold: hedging the baskets with the legs always passes, stacking on top of them is clipped
+        basket_limit = self.resource_traders["GIFT_BASKET"].product_limit
+        self.orderManager.exposure_limits = {component: max(self.resource_traders[component].product_limit, units * basket_limit)
+                                             for component, units in BASKET_CONTENTS.items()}
+        self.order_books: Dict[Symbol, OrderBook] = {} # reused tick to tick by build_books
+        self.checkpointer: Checkpointer = Checkpointer(self.resource_traders)
+        self.restored = False
+        # streaming book features, only for the symbols a trader lists in uses_features
+        self.book_features: Dict[Symbol, BookFeatures] = {
+            symbol: BookFeatures() for trader in self.resource_traders.values() for symbol in trader.uses_features
+        }
+        self.profiler: Profiler = None # set one to time every stage, off on the exchange
 
     def run(self, state: TradingState):
-        if not self.resource_traders:
-            self.resource_traders = jsonpickle.decode(state.traderData) # refresh resource traders in case failed.
+        profiler = self.profiler
+        start = time.perf_counter_ns() if profiler else 0
+
+        if not self.restored:
+            self.checkpointer.decode(state.traderData, self.resource_traders) # refresh resource traders in case AWS lost them
+            self.restored = True
+
+        self.orderManager.begin(state.position, {symbol: trader.product_limit for symbol, trader in self.resource_traders.items()})
+        books = build_books(state, self.order_books) # sort every order depth once, shared by all traders
+        if profiler: start = profiler.lap("*", "books", start)
+        if self.book_features:
+            for symbol, features in self.book_features.items():
+                if symbol in books:
+                    books[symbol].features = features.update(books[symbol])
+            if profiler: start = profiler.lap("*", "features", start)
 
         for product in self.resource_traders.keys():
-            self.resource_traders[product].process(state)
+            self.resource_traders[product].process(state, books)
+            if profiler: start = profiler.lap(product, "process", start)
             self.resource_traders[product].trade(self.orderManager)
+            if profiler: start = profiler.lap(product, "trade", start)
 
-        traderData = jsonpickle.encode(self.resource_traders) # backup in case AWS messes up and deletes state
+        traderData = self.checkpointer.encode(self.resource_traders) # backup in case AWS messes up and deletes state
+        if profiler: start = profiler.lap("*", "checkpoint", start)
         result = self.orderManager.getAllOrders()
         self.orderManager.clearOrders()
 
         conversions = self.orderManager.conversions
-        logger.flush(state, result, conversions, "sample")
+        logger.flush(state, result, conversions, traderData)
+        if profiler: profiler.lap("*", "flush", start)
         return result, conversions, traderData
     
 
+class Profiler:
+    # fixed log-linear histograms of nanosecond timings, 4 buckets per power of two
+    BUCKETS = 160
+
+    def __init__(self) -> None:
+        self.histograms: Dict[Tuple[str, str], List[int]] = {}
+        self.maximums: Dict[Tuple[str, str], int] = {}
+
+    @staticmethod
+    def bucket(ns: int) -> int:
+        if ns < 4:
+            return max(ns, 0)
+        octave = ns.bit_length() - 1
+        return min(octave * 4 + ((ns >> (octave - 2)) & 3), Profiler.BUCKETS - 1)
+
+    @staticmethod
+    def bucket_limit(bucket: int) -> int:
+        if bucket < 4:
+            return bucket
+        octave, sub = divmod(bucket, 4)
+        return (4 + sub + 1) << (octave - 2)
+
+    def record(self, product: str, stage: str, ns: int) -> None:
+        key = (product, stage)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = [0] * self.BUCKETS
+            self.maximums[key] = 0
+        histogram[self.bucket(ns)] += 1
+        if ns > self.maximums[key]:
+            self.maximums[key] = ns
+
+    def lap(self, product: str, stage: str, start: int) -> int:
+        now = time.perf_counter_ns()
+        self.record(product, stage, now - start)
+        return now
+
+    def merge(self, other: "Profiler") -> None:
+        for key, histogram in other.histograms.items():
+            mine = self.histograms.setdefault(key, [0] * self.BUCKETS)
+            for bucket, count in enumerate(histogram):
+                mine[bucket] += count
+            self.maximums[key] = max(self.maximums.get(key, 0), other.maximums[key])
+
+    def percentile(self, key: Tuple[str, str], fraction: float) -> int:
+        histogram = self.histograms[key]
+        target = fraction * sum(histogram)
+        seen = 0
+        for bucket, count in enumerate(histogram):
+            seen += count
+            if count and seen >= target:
+                return min(self.bucket_limit(bucket), self.maximums[key])
+        return self.maximums[key]
+
+    def summary(self) -> str:
+        lines = [f"{'product':<14} {'stage':<11} {'calls':>7} {'p50 us':>9} {'p99 us':>9} {'max us':>9}"]
+        for key in sorted(self.histograms):
+            product, stage = key
+            calls = sum(self.histograms[key])
+            lines.append(f"{product:<14} {stage:<11} {calls:>7} {self.percentile(key, 0.5) / 1000:>9.1f} {self.percentile(key, 0.99) / 1000:>9.1f} {self.maximums[key] / 1000:>9.1f}")
+        return "\n".join(lines)
+
+
+# units of each product in one GIFT_BASKET, for net exposure across the basket legs
+BASKET_CONTENTS: Dict[Symbol, int] = {"CHOCOLATE": 4, "STRAWBERRIES": 6, "ROSES": 1}
+
+
 class OrderManager:
+    # every order passes through here. it is clipped against what is left of the product's limit
+    # on its side and against the basket component exposure, then merged into any earlier order at
+    # the same price and side. the totals can't breach a limit, so getAllOrders sends them as is.
     def __init__(self):
-        self.all_orders: Dict[Symbol: list[Order]] = {}
+        self.all_orders: Dict[Symbol, Dict[Tuple[int, bool], int]] = {} # (price, is buy) -> quantity, in creation order
         self.conversions: int = 0
-    
-    def createConversion(self, position: int):
-        self.conversions = -position
-    
+        self.conversion_requests: Dict[Symbol, int] = {}
+        self.positions: Dict[Symbol, int] = {}
+        self.limits: Dict[Symbol, int] = {}
+        self.exposure_limits: Dict[Symbol, int] = {} # on net basket exposure per component, unchecked when empty
+        self.buys: Dict[Symbol, int] = {} # pending volume per side
+        self.sells: Dict[Symbol, int] = {}
+        self.clipped: Dict[Symbol, int] = {}
+
+    def begin(self, positions: Dict[Symbol, int], limits: Dict[Symbol, int]) -> None:
+        self.clearOrders()
+        self.positions = positions
+        self.limits = limits
+        self.conversion_requests = {}
+        self.conversions = 0
+
+    def createConversion(self, position: int, product: Symbol = "ORCHIDS"):
+        self.conversion_requests[product] = -position
+        self.conversions = sum(self.conversion_requests.values())
+
+    def exposure(self, component: Symbol) -> int:
+        # net units of a basket component held, directly or inside baskets, counting pending orders
+        def net(product):
+            return self.positions.get(product, 0) + self.buys.get(product, 0) - self.sells.get(product, 0)
+        return net(component) + BASKET_CONTENTS[component] * net("GIFT_BASKET")
+
+    def clip_exposure(self, product: Symbol, quantity: int) -> int:
+        if product == "GIFT_BASKET":
+            legs = BASKET_CONTENTS.items()
+        elif product in BASKET_CONTENTS:
+            legs = [(product, 1)]
+        else:
+            return quantity
+        for component, units in legs:
+            limit = self.exposure_limits.get(component)
+            if limit is None:
+                continue
+            exposure = self.exposure(component)
+            if quantity > 0:
+                quantity = min(quantity, max(0, (limit - exposure) // units))
+            else:
+                quantity = max(quantity, min(0, -((limit + exposure) // units)))
+        return quantity
+
     def createOrder(self, product: Symbol, price: int, quantity: int):
-        if product not in self.all_orders:
-            self.all_orders[product] = []
-        self.all_orders[product].append(Order(product, price, quantity))
-    
-    def getAllOrders(self):
-        return self.all_orders
+        requested = quantity
+        limit = self.limits.get(product)
+        if limit is not None:
+            position = self.positions.get(product, 0)
+            if quantity > 0:
+                quantity = min(quantity, max(0, limit - position - self.buys.get(product, 0)))
+            else:
+                quantity = max(quantity, -max(0, limit + position - self.sells.get(product, 0)))
+        if self.exposure_limits:
+            quantity = self.clip_exposure(product, quantity)
+        if quantity != requested:
+            self.clipped[product] = self.clipped.get(product, 0) + abs(requested - quantity)
+        if quantity == 0:
+            return
+
+        if quantity > 0:
+            self.buys[product] = self.buys.get(product, 0) + quantity
+        else:
+            self.sells[product] = self.sells.get(product, 0) - quantity
+        orders = self.all_orders.get(product)
+        if orders is None:
+            orders = self.all_orders[product] = {}
+        key = (price, quantity > 0)
+        orders[key] = orders.get(key, 0) + quantity
+
+    def getAllOrders(self) -> Dict[Symbol, List[Order]]:
+        if self.clipped:
+            logger.print("Clipped volume", self.clipped)
+        return {product: [Order(product, price, quantity) for (price, _), quantity in orders.items()] for product, orders in self.all_orders.items()}
 
     def clearOrders(self):
         self.all_orders = {}
-    
+        self.buys = {}
+        self.sells = {}
+        self.clipped = {}
+
+
+class Checkpointer:
+    # traderData only carries what a fresh Trader can't rebuild on its own: each trader's
+    # checkpoint_fields, and of those only the ones that differ from a freshly constructed trader.
+    VERSION = 1
+
+    def __init__(self, traders: Dict[Symbol, "Traitor"], size_budget: int = 50000) -> None:
+        self.size_budget = size_budget
+        self.defaults: Dict[Symbol, Dict[str, Any]] = {
+            symbol: type(trader)(symbol).checkpoint() for symbol, trader in traders.items()
+        }
+        self.last_fields: Dict[Symbol, Dict[str, Any]] = {}
+        self.fragments: Dict[Symbol, str] = {}
+
+    def delta(self, symbol: Symbol, fields: Dict[str, Any]) -> Dict[str, Any]:
+        defaults = self.defaults.get(symbol, {})
+        return {field: value for field, value in fields.items() if defaults.get(field) != value}
+
+    def encode(self, traders: Dict[Symbol, "Traitor"]) -> str:
+        for symbol, trader in traders.items():
+            fields = trader.checkpoint()
+            if self.last_fields.get(symbol) == fields:
+                continue # unchanged since last tick, reuse the encoded fragment
+            self.last_fields[symbol] = fields
+            delta = self.delta(symbol, fields)
+            if delta:
+                self.fragments[symbol] = json.dumps(symbol) + ":" + json.dumps(delta, separators=(",", ":"))
+            else:
+                self.fragments.pop(symbol, None)
+
+        fragments = list(self.fragments.values())
+        size = sum(len(fragment) + 1 for fragment in fragments)
+        if size > self.size_budget:
+            # drop the biggest traders first, they restart from scratch if we ever need to recover
+            fragments.sort(key=len)
+            while fragments and size > self.size_budget:
+                size -= len(fragments.pop()) + 1
+            logger.print("Checkpoint over budget, kept", len(fragments), "of", len(self.fragments), "traders")
+
+        return '{"v":' + str(self.VERSION) + ',"t":{' + ",".join(fragments) + "}}"
+
+    def decode(self, traderData: str, traders: Dict[Symbol, "Traitor"]) -> None:
+        if not traderData:
+            return
+        try:
+            data = json.loads(traderData)
+        except ValueError:
+            return
+        if not isinstance(data, dict) or data.get("v") != self.VERSION:
+            return
+        checkpoints = data.get("t")
+        if not isinstance(checkpoints, dict):
+            return
+
+        for symbol, fields in checkpoints.items():
+            if symbol in traders and isinstance(fields, dict):
+                traders[symbol].restore(fields)
+
+
+class BookSide:
+    # one side of a book as parallel price/volume lists, best level first.
+    # items() walks it like the sorted OrderedDicts the traders used to build.
+    __slots__ = ("prices", "volumes")
+
+    def __init__(self, prices: List[int], volumes: List[int]) -> None:
+        self.prices = prices
+        self.volumes = volumes
+
+    def items(self):
+        return zip(self.prices, self.volumes)
+
+    def keys(self) -> List[int]:
+        return self.prices
+
+    def values(self) -> List[int]:
+        return self.volumes
+
+    def __iter__(self):
+        return iter(self.prices)
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+
+class OrderBook:
+    # one per symbol, refilled every tick, everything the traders read is precomputed here.
+    # this runs for every symbol every tick, so it stays flat: no helper calls, slots only, and
+    # the same objects are reused across ticks rather than allocated again
+    __slots__ = ("buy_orders", "sell_orders", "best_bid", "best_ask", "worst_bid", "worst_ask",
+                 "mid_price", "total_bid_volume", "total_ask_volume", "features")
+
+    def __init__(self, order_depth: OrderDepth = None) -> None:
+        self.buy_orders = BookSide([], [])
+        self.sell_orders = BookSide([], [])
+        self.features: BookFeatures = None # filled in by Trader.run if a trader uses them
+        self.update(order_depth or OrderDepth())
+
+    def update(self, order_depth: OrderDepth) -> "OrderBook":
+        buys = order_depth.buy_orders
+        sells = order_depth.sell_orders
+        bid_prices = sorted(buys, reverse=True)
+        ask_prices = sorted(sells)
+        bid_volumes = list(map(buys.__getitem__, bid_prices))
+        ask_volumes = list(map(sells.__getitem__, ask_prices))
+        side = self.buy_orders
+        side.prices = bid_prices
+        side.volumes = bid_volumes
+        side = self.sell_orders
+        side.prices = ask_prices
+        side.volumes = ask_volumes
+
+        if bid_prices:
+            self.best_bid = bid_prices[0]
+            self.worst_bid = bid_prices[-1]
+        else:
+            self.best_bid = self.worst_bid = None
+        if ask_prices:
+            self.best_ask = ask_prices[0]
+            self.worst_ask = ask_prices[-1]
+        else:
+            self.best_ask = self.worst_ask = None
+        self.mid_price = (self.best_bid + self.best_ask) / 2 if bid_prices and ask_prices else None
+
+        self.total_bid_volume = sum(bid_volumes)
+        self.total_ask_volume = -sum(ask_volumes)
+        return self
+
+
+class BookFeatures:
+    # streaming twin of analyzing/book_features.py for one symbol. the same float operations in the
+    # same order, best level first from 0, so live values are bit-identical to the offline columns
+    LEVELS = 3
+
+    def __init__(self) -> None:
+        self.imbalance = math.nan
+        self.depth_imbalance = math.nan
+        self.microprice = math.nan
+        self.weighted_mid = math.nan
+        self.depth_spread = math.nan
+        self.bid_queue_change = 0.0
+        self.ask_queue_change = 0.0
+        self.order_flow_imbalance = 0.0
+        self.bid = None # (price, volume) of the previous best levels
+        self.ask = None
+
+    @staticmethod
+    def vwap(prices: List[int], volumes: List[int], sign: int) -> Tuple[float, int]:
+        notional = 0.0
+        depth = 0
+        for level in range(min(len(prices), BookFeatures.LEVELS)):
+            notional = notional + prices[level] * (sign * volumes[level])
+            depth += sign * volumes[level]
+        return (notional / depth if depth > 0 else math.nan), depth
+
+    @staticmethod
+    def queue_change(level: Tuple[int, int], previous: Tuple[int, int], improving: int) -> float:
+        if level is None or previous is None:
+            return 0.0
+        direction = (level[0] - previous[0]) * improving
+        if direction > 0:
+            return float(level[1])
+        if direction < 0:
+            return -float(previous[1])
+        return float(level[1] - previous[1])
+
+    def update(self, book: OrderBook) -> "BookFeatures":
+        bids = book.buy_orders
+        asks = book.sell_orders
+        bid = (bids.prices[0], bids.volumes[0]) if bids.prices else None
+        ask = (asks.prices[0], -asks.volumes[0]) if asks.prices else None
+        bid_vwap, bid_depth = self.vwap(bids.prices, bids.volumes, 1)
+        ask_vwap, ask_depth = self.vwap(asks.prices, asks.volumes, -1)
+
+        if bid is None or ask is None or bid[1] + ask[1] == 0:
+            self.imbalance = self.microprice = math.nan
+        else:
+            top = bid[1] + ask[1]
+            self.imbalance = (bid[1] - ask[1]) / top
+            self.microprice = (bid[0] * ask[1] + ask[0] * bid[1]) / top
+        if bid_depth > 0 and ask_depth > 0:
+            self.depth_imbalance = (bid_depth - ask_depth) / (bid_depth + ask_depth)
+        else:
+            self.depth_imbalance = math.nan
+        self.weighted_mid = (bid_vwap + ask_vwap) / 2
+        self.depth_spread = ask_vwap - bid_vwap
+
+        self.bid_queue_change = self.queue_change(bid, self.bid, 1)
+        self.ask_queue_change = self.queue_change(ask, self.ask, -1)
+        self.order_flow_imbalance = self.bid_queue_change - self.ask_queue_change
+        self.bid = bid
+        self.ask = ask
+        return self
+
+
+class TreeModel:
+    # regression tree exported by analyzing/data_round2/flat_tree.py, walked over plain lists
+    def __init__(self, data: Dict[str, Any]) -> None:
+        self.feature_names: List[str] = data["feature_names"]
+        self.feature: List[int] = data["feature"]
+        self.threshold: List[float] = data["threshold"]
+        self.left: List[int] = data["left"]
+        self.right: List[int] = data["right"]
+        self.value: List[float] = data["value"]
+
+    def predict(self, *features: float) -> float:
+        node = 0
+        while self.left[node] != -1:
+            if features[self.feature[node]] <= self.threshold[node]:
+                node = self.left[node]
+            else:
+                node = self.right[node]
+        return self.value[node]
+
+
+class PriceHistory:
+    # fixed-capacity ring buffer of doubles, oldest value first. every value is written twice so the
+    # window values[start:start + count] is always one contiguous slice, no shifting or copying.
+    __slots__ = ("capacity", "values", "start", "count", "total", "ema", "alpha")
+
+    def __init__(self, capacity: int, ema_period: int = None) -> None:
+        self.capacity = capacity
+        self.values = array("d", bytes(16 * capacity)) # 2 * capacity zeros
+        self.start = 0
+        self.count = 0
+        self.total = 0.0 # rolling sum of the window
+        self.ema = None
+        self.alpha = 2 / ((ema_period or capacity) + 1)
+
+    def append(self, value: float) -> None:
+        if self.count == self.capacity:
+            slot = self.start # overwrite the oldest value
+            self.total -= self.values[slot]
+            self.start = (self.start + 1) % self.capacity
+        else:
+            slot = self.count
+            self.count += 1
+        self.values[slot] = value
+        self.values[slot + self.capacity] = value
+        self.total += value
+        self.ema = value if self.ema is None else self.ema + self.alpha * (value - self.ema)
+
+    def window(self) -> array:
+        return self.values[self.start:self.start + self.count]
+
+    def full(self) -> bool:
+        return self.count == self.capacity
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else None
+
+    def predict(self, coefficients: List[float], intercept: float) -> float:
+        # linear model over the window, coefficients[0] weights the oldest value
+        return sum((coefficient * value for coefficient, value in zip(coefficients, self.window())), intercept)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def checkpoint(self) -> List[Any]:
+        return [self.window().tolist(), self.ema]
+
+    def restore(self, data: List[Any]) -> None:
+        values, ema = data
+        self.start = 0
+        self.count = 0
+        self.total = 0.0
+        for value in values[-self.capacity:]:
+            self.append(value)
+        self.ema = ema
+
+
+class LinearModel:
+    # linear regression exported by analyzing/model_registry.py
+    __slots__ = ("features", "coefficients", "intercept")
+
+    def __init__(self, data: Dict[str, Any]) -> None:
+        self.features: List[str] = data["features"]
+        self.coefficients: List[float] = data["coefficients"]
+        self.intercept: float = data["intercept"]
+
+    def weights(self, features: List[str]) -> List[float]:
+        # coefficients in the given feature order, 0 for features the model doesn't use
+        lookup = dict(zip(self.features, self.coefficients))
+        return [lookup.get(feature, 0) for feature in features]
+
+    def predict(self, *values: float) -> float:
+        return self.intercept + sum(coefficient * value for coefficient, value in zip(self.coefficients, values))
+
+
+def load_model(name: str):
+    data = MODELS.get(name)
+    if data is None:
+        return None
+    return LinearModel(data) if data["kind"] == "linear" else TreeModel(data)
+
+
+def build_books(state: TradingState, cache: Dict[Symbol, OrderBook] = None) -> Dict[Symbol, OrderBook]:
+    # a fresh dict every tick. with a cache the OrderBooks in it are refilled in place
+    if cache is None:
+        return {symbol: OrderBook(order_depth) for symbol, order_depth in state.order_depths.items()}
+    books = {}
+    for symbol, order_depth in state.order_depths.items():
+        book = cache.get(symbol)
+        books[symbol] = book.update(order_depth) if book is not None else cache.setdefault(symbol, OrderBook(order_depth))
+    return books
+
 
 class Traitor:
+    checkpoint_fields: List[str] = ["product_limit"]
+    uses_features: List[Symbol] = [] # symbols whose book.features this trader reads
+
     def __init__(self, symbol: str) -> None:
         self.symbol: str = symbol
         self.product_limit: int = 0
+
+    def checkpoint(self) -> Dict[str, Any]:
+        fields = {}
+        for field in self.checkpoint_fields:
+            value = getattr(self, field)
+            if isinstance(value, PriceHistory):
+                value = value.checkpoint()
+            elif isinstance(value, list):
+                value = list(value) # copy so in-place edits show up as changes
+            fields[field] = value
+        return fields
+
+    def restore(self, fields: Dict[str, Any]) -> None:
+        for field, value in fields.items():
+            if field not in self.checkpoint_fields:
+                continue
+            current = getattr(self, field, None)
+            if isinstance(current, PriceHistory):
+                current.restore(value)
+            else:
+                setattr(self, field, value)
     
-    def process(self, state: TradingState) -> None:
+    def process(self, state: TradingState, books: Dict[Symbol, OrderBook]) -> None:
         pass
 
     def trade(self, orderManager: OrderManager) -> None:
         pass
 
 
+class BasketSignal:
+    # every gift basket leg regresses on the same four log deviations from the starting mids.
+    # Trader owns one and attaches the legs, the first leg to process a tick computes the
+    # deviations once. a leg's fair deviation is only worked out when it asks for it.
+    symbols = ["GIFT_BASKET", "CHOCOLATE", "STRAWBERRIES", "ROSES"] # same order as GiftItem.deviations
+
+    def __init__(self) -> None:
+        self.legs: List["GiftItem"] = []
+        self.books: Dict[Symbol, OrderBook] = None
+        self.start_prices: List[float] = None
+        self.deviations: List[float] = [0, 0, 0, 0]
+
+    def attach(self, leg: "GiftItem") -> None:
+        self.legs.append(leg)
+        leg.signal = self
+
+    def update(self, books: Dict[Symbol, OrderBook]) -> None:
+        if books is self.books:
+            return # another leg already did this tick
+        self.books = books
+
+        mids = []
+        for symbol in self.symbols:
+            book = books.get(symbol)
+            if book is None or book.worst_bid is None or book.worst_ask is None:
+                return # a leg without a two-sided book keeps the last deviations
+            mids.append((book.worst_bid + book.worst_ask) / 2)
+        if self.start_prices is None:
+            # a leg restored from traderData keeps its starting mids
+            restored = [leg.start_prices() for leg in self.legs if leg.start_basket_price is not None]
+            self.start_prices = restored[0] if restored else mids
+
+        log = math.log
+        self.deviations = [log(mid / start) for mid, start in zip(mids, self.start_prices)]
+
+    def fair_deviation(self, leg: "GiftItem") -> float:
+        d0, d1, d2, d3 = self.deviations
+        c0, c1, c2, c3 = leg.coefficients
+        return leg.intercept + (c0 * d0 + c1 * d1 + c2 * d2 + c3 * d3)
+
+
 class GiftItem(Traitor):
+    deviations = ["basket_deviation", "chocolate_deviation", "strawberry_deviation", "rose_deviation"]
+    checkpoint_fields = Traitor.checkpoint_fields + ["start_basket_price", "start_chocolate_price", "start_strawberry_price", "start_rose_price", "coefficients", "intercept"]
+
     def __init__(self, symbol: str) -> None:
         self.symbol = symbol
         self.product_limit = 0
@@ -92,51 +644,40 @@ class GiftItem(Traitor):
         self.chocolate_deviation = 0
         self.strawberry_deviation = 0
         self.rose_deviation = 0
+        self.coefficients = [0, 0, 0, 0] # on the basket, chocolate, strawberry and rose deviations
+        self.intercept = 0
+        BasketSignal().attach(self) # Trader swaps in the one it shares across the legs
     
 
-    def get_mid_price(self, state: TradingState, symbol: str) -> float:
-        sell_orders = collections.OrderedDict(sorted(state.order_depths[symbol].sell_orders.items()))
-        buy_orders = collections.OrderedDict(sorted(state.order_depths[symbol].buy_orders.items(), reverse=True))
-        best_buy_price = next(reversed(buy_orders))
-        best_ask_price = next(reversed(sell_orders))
-        return (best_buy_price + best_ask_price) / 2
+    def use_model(self, name: str) -> None:
+        model = load_model(name)
+        self.coefficients = model.weights(self.deviations)
+        self.intercept = model.intercept
+
+    def get_mid_price(self, books: Dict[Symbol, OrderBook], symbol: str) -> float:
+        book = books[symbol]
+        return (book.worst_bid + book.worst_ask) / 2
 
     
-    def process(self, state: TradingState) -> None:
+    def process(self, state: TradingState, books: Dict[Symbol, OrderBook]) -> None:
         self.position = state.position.get(self.symbol, 0)
-        self.sell_orders = collections.OrderedDict(sorted(state.order_depths[self.symbol].sell_orders.items()))
-        self.buy_orders = collections.OrderedDict(sorted(state.order_depths[self.symbol].buy_orders.items(), reverse=True))
-        self.best_buy_price = next(reversed(self.buy_orders))
-        self.best_ask_price = next(reversed(self.sell_orders))
-
-        if self.start_basket_price is None:
-            self.start_basket_price = self.get_mid_price(state, "GIFT_BASKET")
-            self.start_chocolate_price = self.get_mid_price(state, "CHOCOLATE")
-            self.start_strawberry_price = self.get_mid_price(state, "STRAWBERRIES")
-            self.start_rose_price = self.get_mid_price(state, "ROSES")
-        
-        for symbol in state.order_depths.keys():
-            mid_price = self.get_mid_price(state, symbol)
-            if symbol == "CHOCOLATE":
-                # if self.previous_chocolate_price == 0:
-                #     self.previous_chocolate_price = mid_price
-                self.chocolate_deviation = np.log(mid_price / self.start_chocolate_price)
-                #self.previous_chocolate_price = mid_price
-            elif symbol == "STRAWBERRIES":
-                # if self.previous_strawberry_price == 0:
-                #     self.previous_strawberry_price = mid_price
-                self.strawberry_deviation = np.log(mid_price / self.start_strawberry_price)
-                #self.previous_strawberry_price = mid_price
-            elif symbol == "ROSES":
-                # if self.previous_rose_price == 0:
-                #     self.previous_rose_price = mid_price
-                self.rose_deviation = np.log(mid_price / self.start_rose_price)
-                #self.previous_rose_price = mid_price
-            elif symbol == "GIFT_BASKET":
-                # if self.previous_basket_price == 0:
-                #     self.previous_basket_price = mid_price
-                self.basket_deviation = np.log(mid_price / self.start_basket_price)
-                #self.previous_basket_price = mid_price
+        book = books[self.symbol]
+        self.sell_orders = book.sell_orders
+        self.buy_orders = book.buy_orders
+        self.best_buy_price = book.worst_bid
+        self.best_ask_price = book.worst_ask
+
+        self.signal.update(books)
+        if self.signal.start_prices is not None:
+            self.start_basket_price, self.start_chocolate_price, self.start_strawberry_price, self.start_rose_price = self.signal.start_prices
+        self.basket_deviation, self.chocolate_deviation, self.strawberry_deviation, self.rose_deviation = self.signal.deviations
+
+    def start_prices(self) -> List[float]:
+        return [self.start_basket_price, self.start_chocolate_price, self.start_strawberry_price, self.start_rose_price]
+
+    def expected_deviation(self) -> float:
+        # only GiftTrader prices off its fair value, the other legs trade around their mid
+        return self.signal.fair_deviation(self)
 
     def expected_price(self):
         pass
@@ -167,13 +708,12 @@ class ChocolateTrader(GiftItem):
         super().__init__(symbol)
         self.product_limit = 250
         self.num_items_in_basket = 4
+        self.use_model("chocolate")
     
-    def process(self, state: TradingState) -> None:
-        super().process(state)
+    def process(self, state: TradingState, books: Dict[Symbol, OrderBook]) -> None:
+        super().process(state, books)
 
     def expected_price(self):
-        expected_chocolate_deviation = (1.90804964 * self.basket_deviation) + (-0.57008893 * self.strawberry_deviation) + (-0.38161253 * self.rose_deviation) - 0.0002940641867402241
-        expected_chocolate_price = self.start_chocolate_price * np.exp(expected_chocolate_deviation)
         return (self.best_ask_price + self.best_buy_price) / 2
     
     def trade(self, orderManager: OrderManager) -> None:
@@ -185,13 +725,12 @@ class StrawberryTrader(GiftItem):
         super().__init__(symbol)
         self.product_limit = 350
         self.num_items_in_basket = 6
+        self.use_model("strawberry")
     
-    def process(self, state: TradingState) -> None:
-        super().process(state)
+    def process(self, state: TradingState, books: Dict[Symbol, OrderBook]) -> None:
+        super().process(state, books)
 
     def expected_price(self):
-        expected_strawberry_deviation = (-1.01644375 * self.chocolate_deviation) + (-1.29602731 * self.rose_deviation) + (2.43743794 * self.basket_deviation) + 0.0018273749461782483
-        expected_strawberry_price = self.start_strawberry_price * np.exp(expected_strawberry_deviation) / (self.num_items_in_basket)
         return (self.best_ask_price + self.best_buy_price) / 2
     
     def trade(self, orderManager: OrderManager) -> None:
@@ -203,14 +742,12 @@ class RoseTrader(GiftItem):
         super().__init__(symbol)
         self.product_limit = 60
         self.num_items_in_basket = 1
+        self.use_model("rose")
     
-    def process(self, state: TradingState) -> None:
-        super().process(state)
+    def process(self, state: TradingState, books: Dict[Symbol, OrderBook]) -> None:
+        super().process(state, books)
     
     def expected_price(self):
-        expected_rose_deviation = (3.98579962 * self.basket_deviation) + (-1.29602731 * self.strawberry_deviation) + (-1.99003957 * self.chocolate_deviation) - 0.0019972956749151373
-        expected_rose_price = self.start_rose_price * np.exp(expected_rose_deviation)
-
         return (self.best_ask_price + self.best_buy_price) / 2
 
     def trade(self, orderManager: OrderManager) -> None:
@@ -221,13 +758,14 @@ class GiftTrader(GiftItem):
     def __init__(self, symbol: str) -> None:
         super().__init__(symbol)
         self.product_limit = 60
+        self.use_model("basket")
     
-    def process(self, state: TradingState) -> None:
-        super().process(state)
+    def process(self, state: TradingState, books: Dict[Symbol, OrderBook]) -> None:
+        super().process(state, books)
 
     def expected_price(self):
-        expected_basket_deviation = (0.45610365 * self.chocolate_deviation) + (0.32678862 * self.strawberry_deviation) + (0.18270502 * self.rose_deviation) - 0.00043099352457925955
-        expected_basket_price = self.start_basket_price * np.exp(expected_basket_deviation)
+        expected_basket_deviation = self.expected_deviation()
+        expected_basket_price = self.start_basket_price * math.exp(expected_basket_deviation)
         return expected_basket_price
 
     def trade(self, orderManager: OrderManager) -> None:
@@ -235,19 +773,25 @@ class GiftTrader(GiftItem):
 
 
 class OrchidTrader(Traitor):
+    checkpoint_fields = Traitor.checkpoint_fields + ["history", "coefficients", "intercept", "stored_fee", "buy_edge", "sell_edge", "quote_offset"]
+
     def __init__(self, symbol: str) -> None:
         self.symbol = symbol
         self.product_limit = 100
         self.position = 0
         self.adjusted_conversion_ask_price = 0
         self.adjusted_conversion_bid_price = 0
-        self.stored_fee = 0.1 # per 1 unit long per timestamp
+        self.stored_fee = 0.1 # per 1 unit long per timestamp, a local buy is held until the next conversion so it has to clear this
+        self.buy_edge = 0 # how far under the conversion bid a local ask has to be to take it
+        self.sell_edge = 0
+        self.quote_offset = 3 # trade2 quotes this far past the future conversion prices, see conversion_sim.py
         self.sell_orders = None
         self.buy_orders = None
         self.predicted_price = 0
-        self.cache = [None, None, None, None]
-        self.coefficients = [-0.00288106, 0.01107265, -0.01295004, 1.00473299]
-        self.intercept = 0.02269031575860936
+        self.history = PriceHistory(4) # last four mids, oldest first
+        model = load_model("orchid")
+        self.coefficients = list(model.coefficients)
+        self.intercept = model.intercept
         self.best_buy_price = 0
         self.best_ask_price = 0
         self.acceptable_bid = 0
@@ -255,8 +799,11 @@ class OrchidTrader(Traitor):
         self.bidPrice = 0
         self.askPrice = 0
         self.humidity = 0
+        self.sunlight = 0
+        self.tree: TreeModel = load_model("orchid_tree") # sunlight/humidity price model, None unless deployed
+        self.tree_price = None
     
-    def process(self, state: TradingState) -> None:
+    def process(self, state: TradingState, books: Dict[Symbol, OrderBook]) -> None:
         self.bidPrice = state.observations.conversionObservations["ORCHIDS"].bidPrice
         self.askPrice = state.observations.conversionObservations["ORCHIDS"].askPrice
         importTariff = state.observations.conversionObservations["ORCHIDS"].importTariff
@@ -268,30 +815,30 @@ class OrchidTrader(Traitor):
 
         self.position = state.position.get(self.symbol, 0)
 
-        self.sell_orders = collections.OrderedDict(sorted(state.order_depths[self.symbol].sell_orders.items()))
-        self.buy_orders = collections.OrderedDict(sorted(state.order_depths[self.symbol].buy_orders.items(), reverse=True))
+        book = books[self.symbol]
+        self.sell_orders = book.sell_orders
+        self.buy_orders = book.buy_orders
 
-        self.best_buy_price = next(reversed(self.buy_orders))
-        self.best_ask_price = next(reversed(self.sell_orders))
+        self.best_buy_price = book.worst_bid
+        self.best_ask_price = book.worst_ask
         future_mid_price = self.predict_next_price()
         self.future_adjusted_conversion_bid_price = int(math.floor(future_mid_price - exportTariff - transportFees)) # - (100 * self.stored_fee)))
         self.future_adjusted_conversion_ask_price = int(math.ceil(future_mid_price + importTariff + transportFees))
         self.humidity = state.observations.conversionObservations["ORCHIDS"].humidity
+        self.sunlight = state.observations.conversionObservations["ORCHIDS"].sunlight
+        if self.tree is not None:
+            self.tree_price = self.tree.predict(self.sunlight, self.humidity)
 
         return
     
     
     def predict_next_price(self):
-        prediction = 0
-        if None in self.cache:
-            prediction = (self.bidPrice + self.askPrice) / 2
-        else:
-            prediction = self.intercept
-            for i, val in enumerate(self.cache):
-                prediction += val * self.coefficients[i]
+        mid_price = (self.bidPrice + self.askPrice) / 2
+        prediction = mid_price
+        if self.history.full():
+            prediction = self.history.predict(self.coefficients, self.intercept)
 
-        self.cache = [self.cache[1], self.cache[2], self.cache[3], (self.bidPrice + self.askPrice) / 2]
-        # logger.print((self.bidPrice + self.askPrice) / 2, self.cache[2])
+        self.history.append(mid_price)
         return prediction
     
 
@@ -299,13 +846,13 @@ class OrchidTrader(Traitor):
         arbitrage_position = self.position
 
         for ask, vol in self.sell_orders.items():
-            if arbitrage_position < self.product_limit and ask < self.adjusted_conversion_bid_price:
+            if arbitrage_position < self.product_limit and ask < self.adjusted_conversion_bid_price - self.stored_fee - self.buy_edge:
                 order_volume = min(-vol, self.product_limit - arbitrage_position)
                 arbitrage_position += order_volume
                 orderManager.createOrder(self.symbol, ask, order_volume)
         
         for bid, vol in self.buy_orders.items():
-            if arbitrage_position > -self.product_limit and bid > self.adjusted_conversion_ask_price:
+            if arbitrage_position > -self.product_limit and bid > self.adjusted_conversion_ask_price + self.sell_edge:
                 # logger.print(self.humidity, self.adjusted_conversion_ask_price, bid)
                 order_volume = max(-vol, -self.product_limit - arbitrage_position)
                 arbitrage_position += order_volume
@@ -319,7 +866,7 @@ class OrchidTrader(Traitor):
         real_position = self.position
 
         for ask, vol in self.sell_orders.items():
-            if (ask < self.adjusted_conversion_bid_price) and current_position < self.product_limit:
+            if (ask < self.adjusted_conversion_bid_price - self.stored_fee - self.buy_edge) and current_position < self.product_limit:
                 order_volume = min(-vol, self.product_limit - current_position)
                 real_position += order_volume
                 current_position += order_volume
@@ -327,13 +874,13 @@ class OrchidTrader(Traitor):
 
         if current_position < self.product_limit:
             num = self.product_limit - current_position
-            orderManager.createOrder(self.symbol, self.future_adjusted_conversion_ask_price + 3, num)
+            orderManager.createOrder(self.symbol, self.future_adjusted_conversion_ask_price + self.quote_offset, num)
             current_position += num
         
         current_position = self.position
         
         for bid, vol in self.buy_orders.items():
-            if (bid > self.adjusted_conversion_ask_price) and current_position > -self.product_limit:
+            if (bid > self.adjusted_conversion_ask_price + self.sell_edge) and current_position > -self.product_limit:
                 order_volume = max(-vol, -self.product_limit - current_position)
                 real_position += order_volume
                 current_position += order_volume
@@ -341,19 +888,23 @@ class OrchidTrader(Traitor):
 
         if current_position > -self.product_limit:
             num = -self.product_limit - current_position
-            orderManager.createOrder(self.symbol, self.future_adjusted_conversion_bid_price - 3, num)
+            orderManager.createOrder(self.symbol, self.future_adjusted_conversion_bid_price - self.quote_offset, num)
         
         orderManager.createConversion(self.position)
 
 
 class StarfruitTrader(Traitor):
+    checkpoint_fields = Traitor.checkpoint_fields + ["history", "coefficients", "intercept", "edge"]
+
     def __init__(self, symbol: str) -> None:
         self.symbol = symbol
         self.product_limit = 20
         self.position = 0
-        self.cache = [None, None, None, None]
-        self.coefficients = [0.18925881, 0.20729211, 0.26096944, 0.3419978]
-        self.intercept = 2.088673614521994
+        self.history = PriceHistory(4) # last four mids, oldest first
+        model = load_model("starfruit")
+        self.coefficients = list(model.coefficients)
+        self.intercept = model.intercept
+        self.edge = 1 # how far from the predicted price we quote
         self.sell_orders = None
         self.buy_orders = None
         self.best_buy_price = 0
@@ -361,27 +912,25 @@ class StarfruitTrader(Traitor):
         self.acceptable_bid = 0
         self.acceptable_ask = 0
     
-    def process(self, state: TradingState) -> None:
+    def process(self, state: TradingState, books: Dict[Symbol, OrderBook]) -> None:
         self.position = state.position.get(self.symbol, 0)
-        self.sell_orders = collections.OrderedDict(sorted(state.order_depths[self.symbol].sell_orders.items()))
-        self.buy_orders = collections.OrderedDict(sorted(state.order_depths[self.symbol].buy_orders.items(), reverse=True))
-        self.best_buy_price = next(reversed(self.buy_orders))
-        self.best_ask_price = next(reversed(self.sell_orders))
+        book = books[self.symbol]
+        self.sell_orders = book.sell_orders
+        self.buy_orders = book.buy_orders
+        self.best_buy_price = book.worst_bid
+        self.best_ask_price = book.worst_ask
         mid_price = self.predict_next_price()
-        self.acceptable_bid = int(math.floor(mid_price)) - 1
-        self.acceptable_ask = int(math.ceil(mid_price)) + 1
+        self.acceptable_bid = int(math.floor(mid_price)) - self.edge
+        self.acceptable_ask = int(math.ceil(mid_price)) + self.edge
 
 
     def predict_next_price(self):
-        prediction = 0
-        if None in self.cache:
-            prediction = (self.best_ask_price + self.best_buy_price) / 2
-        else:
-            prediction = self.intercept
-            for i, val in enumerate(self.cache):
-                prediction += val * self.coefficients[i]
+        mid_price = (self.best_ask_price + self.best_buy_price) / 2
+        prediction = mid_price
+        if self.history.full():
+            prediction = self.history.predict(self.coefficients, self.intercept)
 
-        self.cache = [self.cache[1], self.cache[2], self.cache[3], (self.best_ask_price + self.best_buy_price) / 2]
+        self.history.append(mid_price)
         return prediction
     
 
@@ -418,28 +967,30 @@ class StarfruitTrader(Traitor):
 
 
 class AmethystTrader(Traitor):
+    checkpoint_fields = Traitor.checkpoint_fields + ["acceptable_bid", "acceptable_ask"]
+
     def __init__(self, symbol: str) -> None:
         self.symbol = symbol
         self.product_limit = 20
         self.acceptable_bid = 10000
         self.acceptable_ask = 10000
         self.position = 0
-        self.buy_orders: collections.OrderedDict = None
-        self.sell_orders: collections.OrderedDict = None
+        self.buy_orders: BookSide = None
+        self.sell_orders: BookSide = None
         self.best_buy_price = 10000
         self.best_ask_price = 10000
 
     
-    def process(self, state: TradingState) -> None:
+    def process(self, state: TradingState, books: Dict[Symbol, OrderBook]) -> None:
         self.position = state.position.get(self.symbol, 0)
 
-        order_depth = state.order_depths[self.symbol]
+        book = books[self.symbol]
 
-        self.sell_orders = collections.OrderedDict(sorted(order_depth.sell_orders.items()))
-        self.buy_orders =  collections.OrderedDict(sorted(order_depth.buy_orders.items(), reverse=True))
+        self.sell_orders = book.sell_orders
+        self.buy_orders = book.buy_orders
 
-        self.best_buy_price = next(reversed(self.buy_orders))
-        self.best_ask_price = next(reversed(self.sell_orders))
+        self.best_buy_price = book.worst_bid
+        self.best_ask_price = book.worst_ask
 
 
     def trade(self, orderManager: OrderManager):
@@ -517,22 +1068,42 @@ class AmethystTrader(Traitor):
 
 
 class Logger:
-    def __init__(self) -> None:
-        self.logs = ""
+    # max_log_length is a budget in utf-8 bytes, lines past it are cut and the rest of the tick dropped
+    def __init__(self, max_log_length: int = 3750) -> None:
+        self.max_log_length = max_log_length
+        self.chunks: List[str] = []
+        self.length = 0
+        self.truncated = False
+
+    @property
+    def logs(self) -> str:
+        return "".join(self.chunks)
 
     def print(self, *objects: Any, sep: str = " ", end: str = "\n") -> None:
-        self.logs += sep.join(map(str, objects)) + end
+        if self.truncated:
+            return
+        line = sep.join(map(str, objects)) + end
+        size = len(line) if line.isascii() else len(line.encode())
+        if self.length + size > self.max_log_length:
+            line = line.encode()[:self.max_log_length - self.length].decode(errors="ignore")
+            size = len(line.encode())
+            self.truncated = True
+        self.chunks.append(line)
+        self.length += size
 
     def flush(self, state: TradingState, orders: dict[Symbol, list[Order]], conversions: int, trader_data: str) -> None:
-        print(json.dumps([
+        compressed = [
             self.compress_state(state),
             self.compress_orders(orders),
             conversions,
             trader_data,
             self.logs,
-        ], cls=ProsperityEncoder, separators=(",", ":")))
+        ]
+        print(json.dumps(compressed, cls=ProsperityEncoder, separators=(",", ":")))
 
-        self.logs = ""
+        self.chunks = []
+        self.length = 0
+        self.truncated = False
 
     def compress_state(self, state: TradingState) -> list[Any]:
         return [